@@ -1,21 +1,51 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
+from mobvis.metrics.utils.Contacts import Contacts
 from mobvis.metrics.utils.IMetric import IMetric
 
 class ContactDuration(IMetric):
-    def __init__(self, filename, trace, df_type, req_dataframes):
+    def __init__(self, contacts_df, gap=30):
         """ Class that corresponds to the Contact Duration (CODU) social metric.
+
+        ### Attributes:
+
+        `contacts_df` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts between the trace nodes. Extracted by the mobvis.metrics.utils.Contacts module.
+        `gap` (float): Largest time between two contacts of the same pair to be considered the same encounter, in seconds.
         """
 
-        self.contacts_df = req_dataframes['contacts_df']
+        self.name = 'CODU'
 
-        super().__init__(filename, trace, df_type)
+        self.contacts_df = contacts_df
+        self.gap = gap
 
     @Timer.timed
-    def extract(self):
-        print('\nExtracting the Contact Time...')
+    def extract(self, proc_num=None, return_dict=None):
+        """ Method that extracts the Contact Duration metric.
+
+        ### Returns:
+
+        `codu_df` (pandas.DataFrame): DataFrame containing the Contact Duration data as shown below:
+            - id1: Identifier of the first node
+            - id2: Identifier of the second node
+            - timestamp: Timestamp where the contact started
+            - contact_duration: Time between the first and the last contact of the encounter
+        """
+        print('\nExtracting the Contact Duration...')
+
+        episodes = Contacts.find_episodes(self.contacts_df, gap=self.gap)
 
+        codu_df = pd.DataFrame({
+            'id1': episodes.id1.values,
+            'id2': episodes.id2.values,
+            'timestamp': episodes.start.values,
+            'contact_duration': episodes.end.values - episodes.start.values
+        })
+        codu_df = Converters.keep_schema(codu_df, episodes)
 
+        if proc_num != None:
+            return_dict[proc_num] = codu_df
 
-        print('\nContact Time extracted successfully!')
+        print('\nContact Duration extracted successfully!')
+        return codu_df
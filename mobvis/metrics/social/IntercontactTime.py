@@ -1,24 +1,31 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
+from mobvis.metrics.utils.Contacts import Contacts
 from mobvis.metrics.utils.IMetric import IMetric
 
 class IntercontactTime(IMetric):
-    def __init__(self, contacts_df):
+    def __init__(self, contacts_df, gap=30):
         """ Class that corresponds to the Inter-contact Time (INCO) social metric.
 
         ### Attributes:
 
-        `contacts_df` (pandas.DataFrame): Contacts between the trace nodes. Extracted by the mobvis.metrics.utils.Contacts module.
+        `contacts_df` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts between the trace nodes. Extracted by the mobvis.metrics.utils.Contacts module.
+            Contacts spilled to disk are streamed part by part. The metric is computed on the contact episodes of `Contacts.find_episodes`.
+        `gap` (float): Contacts of the same pair that occurred more than this number of seconds apart are considered different contacts.
+        `pair_stats` (pandas.DataFrame): Summary of the Intercontact times of each pair (count, mean and median), filled by `extract`.
         """
 
         self.name = 'INCO'
 
         self.contacts_df = contacts_df
+        self.gap = gap
+        self.pair_stats = None
 
 
     @Timer.timed
-    def extract(self):
+    def extract(self, proc_num=None, return_dict=None):
         """ Method that extracts the Intercontact Time metric.
 
         ### Returns:
@@ -27,30 +34,31 @@ class IntercontactTime(IMetric):
             - id1: Identifier of the first node
             - id2: Identifier of the second node
             - intercontact_time: Intercontact time of the two nodes
+
+        The input contacts are not modified.
         """
         print('\nExtracting the Inter-contact Time...')
 
-        self.contacts_df.sort_values(['id1', 'id2', 'timestamp'], inplace=True)
-
-        inco_df = pd.DataFrame(columns=['id1', 'id2', 'intercontact_time'])
-        prev_row = []
-    
-        for index, row in enumerate(self.contacts_df.iterrows()):
-            if index != 0:
-                if row[1].id1 == prev_row[1].id1 and row[1].id2 == prev_row[1].id2:
-                    inco = row[1].timestamp - prev_row[1].timestamp
-                    
-                    if inco > 30:
-                        # Considers that two contacts are different if they occurred at least 30 seconds apart
-                        new_row = pd.DataFrame({
-                            'id1': [row[1].id1],
-                            'id2': [row[1].id2],
-                            'intercontact_time': [inco]
-                        })
-
-                        inco_df = pd.concat([inco_df, new_row], ignore_index=True)
-
-            prev_row = row
-            
+        # Considers that two contacts are different if they occurred more than `gap` seconds apart
+        episodes = Contacts.find_episodes(self.contacts_df, gap=self.gap)
+
+        id1 = episodes.id1.values
+        id2 = episodes.id2.values
+
+        # The episodes are ordered by pair and time, so each one is followed by the next episode of its pair
+        same_pair = (id1[1:] == id1[:-1]) & (id2[1:] == id2[:-1])
+
+        inco_df = pd.DataFrame({
+            'id1': id1[1:][same_pair],
+            'id2': id2[1:][same_pair],
+            'intercontact_time': (episodes.start.values[1:] - episodes.end.values[:-1])[same_pair]
+        })
+        inco_df = Converters.keep_schema(inco_df, episodes)
+
+        self.pair_stats = inco_df.groupby(['id1', 'id2'], sort=False).intercontact_time.agg(['count', 'mean', 'median']).reset_index()
+
+        if proc_num != None:
+            return_dict[proc_num] = inco_df
+
         print('\nInter-contact Time extracted successfully!')
         return inco_df
@@ -2,6 +2,8 @@ from mobvis.utils.Utils import haversine
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
+from mobvis.utils.TraceIndex import TraceIndex
 from mobvis.metrics.utils.IMetric import IMetric
 
 from scipy.spatial import distance
@@ -42,29 +44,36 @@ class RadiusOfGyration(IMetric):
         """
         print('\nExtracting the Radius of Gyration...')
         
-        radg_df = pd.DataFrame(columns=['id', 'home_location', 'radius_of_gyration'])
-    
         id_list = self.trace.id.unique()
-    
+
+        trace, trace_index = TraceIndex.group(self.trace)
+        homes, homes_index = TraceIndex.group(self.homes)
+
+        coordinates = trace[['x', 'y']].values
+        home_x = homes.x.values
+        home_y = homes.y.values
+        home_sl = homes.home_location.values
+
         radg = 0
-    
+        rows = []
+
         for i in id_list:
             # Gets the current node home location
-            home_location = (self.homes.loc[self.homes.id == i].x.values[0], self.homes.loc[self.homes.id == i].y.values[0])
+            home = homes_index.slice(i).start
+            home_location = (home_x[home], home_y[home])
             # Gets all the points visited by this specific node
-            points = [(row[1].x, row[1].y) for row in self.trace.loc[self.trace.id == i].iterrows()]
-        
+            points = coordinates[trace_index.slice(i)]
+
             if self.dist_type.lower() == 'euclidean':
                 radg = self.euclidean_radius_of_gyration_formula(points, home_location)
             elif self.dist_type.lower() == 'haversine':
                 radg = self.haversine_radius_of_gyration_formula(points, home_location)
-            new_row = pd.DataFrame({
-                'id': [i],
-                'home_location': [self.homes.loc[self.homes.id == i].home_location.values[0]],
-                'radius_of_gyration': [radg]
-            })
 
-            radg_df = pd.concat([radg_df, new_row], ignore_index=True)
+            rows.append((i, home_sl[home], radg))
+
+        radg_df = pd.DataFrame(rows, columns=['id', 'home_location', 'radius_of_gyration'])
+
+        radg_df = Converters.keep_schema(radg_df, self.trace_loc)
 
         print('Radius of Gyration extracted successfully!')
 
@@ -1,6 +1,7 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
 from mobvis.metrics.utils.IMetric import IMetric
 
 from concurrent.futures import ThreadPoolExecutor
@@ -61,6 +62,8 @@ class TravelDistance(IMetric):
         elif self.dist_type.lower() == 'euclidean':
             trvd_df = self.euclidean_iterator(trvd_df)
                     
+        trvd_df = Converters.keep_schema(trvd_df, self.trace_loc)
+
         print('Travel Distance extracted successfully!\n')
 
         if proc_num != None:
@@ -1,6 +1,7 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
 from mobvis.metrics.utils.IMetric import IMetric
 
 class VisitOrder(IMetric):
@@ -56,6 +57,8 @@ class VisitOrder(IMetric):
         viso_df = viso_df.drop(['gl'], axis=1)
         viso_df = viso_df.drop_duplicates(subset=['id', 'sl'])
 
+        viso_df = Converters.keep_schema(viso_df, self.trace_loc)
+
         print('Visit Order extracted successfully!')
 
         if proc_num != None:
@@ -1,6 +1,7 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
 from mobvis.metrics.utils.IMetric import IMetric
 
 class TravelTime(IMetric):
@@ -56,6 +57,8 @@ class TravelTime(IMetric):
 
             prev_row = row[1]
                     
+        trvt_df = Converters.keep_schema(trvt_df, self.trace_loc)
+
         print('Travel Distance extracted successfully!\n')
 
         if proc_num != None:
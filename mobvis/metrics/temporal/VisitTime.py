@@ -1,6 +1,7 @@
 import pandas as pd
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
 from mobvis.metrics.utils.IMetric import IMetric
 
 class VisitTime(IMetric):
@@ -62,6 +63,8 @@ class VisitTime(IMetric):
 
             prev_row = curr_row
 
+        vist_df = Converters.keep_schema(vist_df, self.trace_loc)
+
         print('Visit Time extracted successfully!\n')
 
         if proc_num != None:
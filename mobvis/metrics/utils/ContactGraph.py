@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+
+from scipy.sparse import csr_matrix
+
+from mobvis.utils import Timer
+from mobvis.utils.ContactStore import ContactStore
+
+class ContactGraph:
+    """Contacts (or contact episodes) of a trace as weighted, undirected graphs stored on `scipy.sparse` CSR
+       adjacency matrices: one aggregated matrix, or one matrix per time window.
+
+       Row `i` of the matrices corresponds to the node `nodes[i]`. The contacts are added chunk by chunk,
+       so the temporary arrays never grow with the number of contacts, and the matrices only hold one
+       entry per pair of nodes that met on the window.
+    """
+    # Number of contacts added to the matrices at a time
+    CHUNK_ROWS = 10000000
+    # Number of chunk matrices of a window held before they are merged
+    MERGED_CHUNKS = 8
+
+    def __init__(self, nodes, matrices, windows=None, window=None):
+        """ Creates the graph from its matrices. Use `from_contacts` or `from_episodes` to build it.
+
+        ### Attributes:
+
+        `nodes` (numpy.ndarray): Sorted node identifiers, one per row (and column) of the matrices.
+        `matrices` (scipy.sparse.csr_matrix[]): Adjacency matrix of each window, or a single aggregated matrix.
+        `windows` (numpy.ndarray): Start timestamp of each window. `None` for the aggregated graph.
+        `window` (float): Length of the windows, in seconds. `None` for the aggregated graph.
+        """
+        self.nodes = np.asarray(nodes)
+        self.matrices = matrices
+        self.windows = windows
+        self.window = window
+
+    @classmethod
+    @Timer.timed
+    def from_contacts(cls, contacts, window=None, nodes=None):
+        """ Builds the graph from the contacts of `Contacts.detect_contacts`. The weight of each edge is the number of contacts of the pair.
+
+        ### Parameters:
+
+        `contacts` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts of the trace. Contacts spilled to disk are read part by part.
+        `window` (float): If specified, one matrix is built for each time window of this length (in seconds). Otherwise, a single aggregated matrix is built.
+        `nodes` (int[]): Node identifiers mapped to the rows of the matrices. If `None`, the nodes found on the contacts are used.
+
+        ### Returns:
+
+        `graph` (ContactGraph): The contact graph.
+        """
+        print('Building the contact graph...')
+
+        chunks = cls.chunks(contacts, ['id1', 'id2', 'timestamp'])
+
+        return cls.build(chunks, lambda chunk: np.ones(len(chunk), dtype=np.float64), 'timestamp', window, nodes)
+
+    @classmethod
+    @Timer.timed
+    def from_episodes(cls, episodes, window=None, weight='duration', nodes=None):
+        """ Builds the graph from the contact episodes of `Contacts.find_episodes`. Episodes are assigned to the window of their start.
+
+        ### Parameters:
+
+        `episodes` (pandas.DataFrame): Contact episodes of the trace.
+        `window` (float): If specified, one matrix is built for each time window of this length (in seconds). Otherwise, a single aggregated matrix is built.
+        `weight` (str): Weight of the edges. Supported weights are:
+            - duration: total time in contact (end - start of the episodes).
+            - samples: number of contacts.
+            - count: number of episodes.
+        `nodes` (int[]): Node identifiers mapped to the rows of the matrices. If `None`, the nodes found on the episodes are used.
+
+        ### Returns:
+
+        `graph` (ContactGraph): The contact graph.
+        """
+        weights = {
+            'duration': lambda chunk: (chunk.end.values - chunk.start.values).astype(np.float64),
+            'samples': lambda chunk: chunk.samples.values.astype(np.float64),
+            'count': lambda chunk: np.ones(len(chunk), dtype=np.float64)
+        }
+
+        if weight not in weights:
+            raise ValueError(f'Unsupported edge weight: {weight}. Supported weights are: ' + ', '.join(weights))
+
+        print('Building the contact graph...')
+
+        return cls.build(cls.chunks(episodes, None), weights[weight], 'start', window, nodes)
+
+    @classmethod
+    def chunks(cls, df, columns):
+        """ Returns a function that iterates over the contacts in chunks of up to `CHUNK_ROWS` rows.
+        """
+        if isinstance(df, ContactStore):
+            return lambda: df.chunks(columns=columns)
+
+        return lambda: (df.iloc[start:start + cls.CHUNK_ROWS] for start in range(0, len(df), cls.CHUNK_ROWS))
+
+    @classmethod
+    def build(cls, chunks, weights, time_column, window, nodes):
+        """ Adds the contacts of each chunk to the matrices of their windows.
+        """
+        if nodes is None:
+            found = [np.unique(np.r_[chunk.id1.values, chunk.id2.values]) for chunk in chunks()]
+            nodes = np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+        else:
+            nodes = np.unique(np.asarray(nodes))
+
+        n = len(nodes)
+        matrices = {}
+
+        for chunk in chunks():
+            rows = cls.node_positions(nodes, chunk.id1.values)
+            columns = cls.node_positions(nodes, chunk.id2.values)
+            values = weights(chunk)
+
+            # Only the upper triangle is filled, so (a, b) and (b, a) are the same edge
+            rows, columns = np.minimum(rows, columns), np.maximum(rows, columns)
+
+            if window is None:
+                codes = np.zeros(len(rows), dtype=np.int64)
+            else:
+                codes = np.floor(chunk[time_column].values.astype(np.float64) / window).astype(np.int64)
+
+            order = np.argsort(codes, kind='stable')
+            bounds = np.r_[0, np.flatnonzero(np.diff(codes[order])) + 1, len(order)] if len(order) else np.array([0])
+
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                positions = order[start:end]
+                code = int(codes[positions[0]])
+
+                matrix = csr_matrix((values[positions], (rows[positions], columns[positions])), shape=(n, n))
+                uppers = matrices.setdefault(code, [])
+                uppers.append(matrix)
+
+                if len(uppers) == cls.MERGED_CHUNKS:
+                    # The chunk matrices of a window are merged from time to time, so they never grow with the number of contacts
+                    uppers[:] = [cls.combine([(upper.data, upper.row, upper.col) for upper in [upper.tocoo() for upper in uppers]], n)]
+
+        codes = sorted(matrices)
+
+        if window is None:
+            return cls(nodes, [cls.symmetric(matrices.get(0, []), n)])
+
+        windows = np.array(codes, dtype=np.float64) * window
+
+        return cls(nodes, [cls.symmetric(matrices[code], n) for code in codes], windows, window)
+
+    def node_positions(nodes, ids):
+        """ Maps node identifiers to the rows of the matrices.
+        """
+        if len(ids) == 0:
+            return np.array([], dtype=np.int64)
+
+        low, high = ids.min(), ids.max()
+
+        if len(nodes) and np.issubdtype(nodes.dtype, np.integer) and low >= nodes[0] and high - nodes[0] < 4 * len(nodes) + 1000000:
+            # Integer identifiers on a small range are mapped with a lookup table, much faster than a binary search
+            table = np.full(int(high - nodes[0]) + 1, -1, dtype=np.int64)
+            known = nodes[nodes <= high]
+            table[known - nodes[0]] = np.arange(len(known))
+            positions = table[ids - nodes[0]]
+        else:
+            positions = np.searchsorted(nodes, ids)
+            positions[(positions >= len(nodes)) | (nodes[np.minimum(positions, len(nodes) - 1)] != ids)] = -1
+
+        if positions.min() < 0:
+            raise KeyError('The contacts have nodes that are not on the nodes list of the graph.')
+
+        return positions
+
+    @classmethod
+    def symmetric(cls, uppers, n):
+        """ Builds the full adjacency matrix from the upper triangles of the chunks of a window.
+        """
+        uppers = [upper.tocoo() for upper in uppers]
+
+        return cls.combine([(upper.data, upper.row, upper.col) for upper in uppers] + [(upper.data, upper.col, upper.row) for upper in uppers], n)
+
+    def combine(entries, n):
+        """ Sums the (data, rows, columns) entries of several matrices with a single conversion to CSR. Unlike the sparse
+        addition, the edges of weight 0 (e.g. the duration of single-contact episodes) are kept as explicit entries, so
+        they still count on the degrees.
+        """
+        data = np.concatenate([values for values, _, _ in entries] or [np.array([])])
+        rows = np.concatenate([rows for _, rows, _ in entries] or [np.array([], dtype=np.int64)])
+        columns = np.concatenate([columns for _, _, columns in entries] or [np.array([], dtype=np.int64)])
+
+        matrix = csr_matrix((data, (rows, columns)), shape=(n, n))
+        matrix.sort_indices()
+
+        return matrix
+
+    def __len__(self):
+        return len(self.matrices)
+
+    def rows(self, node_ids):
+        """ Returns the rows of the given node identifiers.
+        """
+        return ContactGraph.node_positions(self.nodes, np.atleast_1d(node_ids))
+
+    def matrix(self, window=None):
+        """ Returns the adjacency matrix of a window.
+
+        ### Parameters:
+
+        `window` (int): Position of the window on `windows`. If `None`, the matrices of all the windows are summed.
+
+        ### Returns:
+
+        `matrix` (scipy.sparse.csr_matrix): Weighted adjacency matrix, with one row and column per node.
+        """
+        if window is not None:
+            return self.matrices[window]
+
+        if len(self.matrices) == 0:
+            # Windowed graphs of empty contacts have no windows
+            return csr_matrix((len(self.nodes), len(self.nodes)))
+
+        if len(self.matrices) == 1:
+            return self.matrices[0]
+
+        matrices = [matrix.tocoo() for matrix in self.matrices]
+
+        return ContactGraph.combine([(matrix.data, matrix.row, matrix.col) for matrix in matrices], len(self.nodes))
+
+    def degree(self, window=None):
+        """ Number of different nodes met by each node.
+
+        ### Parameters:
+
+        `window` (int): Position of the window on `windows`. If `None`, the aggregated graph is used.
+
+        ### Returns:
+
+        `degree` (pandas.Series): Degree of each node, indexed by the node identifiers.
+        """
+        matrix = self.matrix(window)
+
+        return pd.Series(np.diff(matrix.indptr), index=self.nodes, name='degree')
+
+    def strength(self, window=None):
+        """ Sum of the edge weights of each node.
+
+        ### Parameters:
+
+        `window` (int): Position of the window on `windows`. If `None`, the aggregated graph is used.
+
+        ### Returns:
+
+        `strength` (pandas.Series): Strength of each node, indexed by the node identifiers.
+        """
+        matrix = self.matrix(window)
+
+        return pd.Series(np.asarray(matrix.sum(axis=1)).ravel(), index=self.nodes, name='strength')
+
+    def neighbors(self, node_id, window=None):
+        """ Nodes met by a node.
+
+        ### Parameters:
+
+        `node_id` (int): Node identifier.
+        `window` (int): Position of the window on `windows`. If `None`, the aggregated graph is used.
+
+        ### Returns:
+
+        `neighbors` (pandas.Series): Edge weight of each neighbor, indexed by the neighbor identifiers.
+        """
+        matrix = self.matrix(window)
+        row = int(self.rows(node_id)[0])
+
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+
+        return pd.Series(matrix.data[start:end], index=self.nodes[matrix.indices[start:end]], name='weight')
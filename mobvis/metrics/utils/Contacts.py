@@ -1,10 +1,18 @@
+import os
+import tempfile
+
+import numpy as np
 import pandas as pd
 
-from itertools import combinations
+from multiprocessing import Pool
 from mobvis.utils import Timer
+from mobvis.utils import Converters
+from mobvis.utils.ContactStore import ContactStore
 
-from mobvis.utils.Utils import haversine
-from scipy.spatial import distance
+from mobvis.utils.Utils import arc_length
+from mobvis.utils.Utils import chord_length
+from mobvis.utils.Utils import to_unit_vectors
+from scipy.spatial import cKDTree
 
 pd.set_option('display.precision', 10)
 
@@ -14,51 +22,273 @@ class Contacts:
     def __init__(self):
         pass
 
-    def euclidean_contact_detection(df, radius):
-        """Apply the contact detection on all pairs of the trace by using the Euclidean formula.
+    def neighbor_pairs(points, groups, radius):
+        """Finds all the pairs of points of the same group that are within `radius` of each other, with a single
+        KD-tree search instead of testing every pair.
+
+        Params:
+
+        `points` (numpy.ndarray): Coordinates of the points, with shape (n, dimensions).
+        `groups` (numpy.ndarray): Integer group of each point (the timestamp code of the points).
+        `radius` (float): Maximum distance between the points of a pair.
+
+        Returns:
+
+        `first` (numpy.ndarray): Positions of the first point of each pair.
+        `second` (numpy.ndarray): Positions of the second point of each pair, always greater than the first one.
         """
-        edges = []
-        raw_data_matrix = df.values
-        
-        for row1, row2 in combinations(raw_data_matrix, 2):
-            lat1 = row1[3]
-            lon1 = row1[2]
-            lat2 = row2[3]
-            lon2 = row2[2]
-            dist = distance.euclidean((lat1, lon1), (lat2, lon2))
+        # The groups are set apart on an extra coordinate, so points of different groups are never within the radius
+        spacing = 2 * radius + 1
+        coords = np.column_stack((points, groups.astype(np.float64) * spacing))
+
+        pairs = cKDTree(coords).query_pairs(radius, output_type='ndarray')
 
-            if dist <= radius:
-                if row1[0] != row2[0]:
-                    edges.append((row1[0], row2[0], lat1, lon1, lat2, lon2, row1[1]))
+        order = np.lexsort((pairs[:, 1], pairs[:, 0]))
 
-        contacts_df = pd.DataFrame(edges, columns=['id1', 'id2', 'x1', 'y1', 'x2', 'y2', 'timestamp'])
+        return [pairs[order, 0], pairs[order, 1]]
 
-        return contacts_df
+    def adjacent_pairs(points, groups, radius):
+        """Finds all the pairs of points of consecutive groups (g and g - 1) that are within `radius` of each other.
 
-    def haversine_contact_detection(df, radius):
-        """Apply the contact detection on all pairs of the trace by using the Haversine formula.
+        Returns:
+
+        `first` (numpy.ndarray): Positions of the points of the group g.
+        `second` (numpy.ndarray): Positions of the points of the group g - 1.
         """
-        edges = []
-        raw_data_matrix = df.values
-        
-        for row1, row2 in combinations(raw_data_matrix, 2):
-            lat1 = row1[3]
-            lon1 = row1[2]
-            lat2 = row2[3]
-            lon2 = row2[2]
-            dist = haversine(lat1, lon1, lat2, lon2)
+        spacing = 2 * radius + 1
+        groups = groups.astype(np.float64)
+
+        # Shifting the groups of the second tree by one aligns each group with the previous one
+        current = cKDTree(np.column_stack((points, groups * spacing)))
+        previous = cKDTree(np.column_stack((points, (groups + 1) * spacing)))
+
+        pairs = current.sparse_distance_matrix(previous, radius, output_type='ndarray')
+
+        return [pairs['i'].astype(np.int64), pairs['j'].astype(np.int64)]
+
+    @classmethod
+    def contact_pairs(cls, df, points, radius, tolerance=None, window='bin'):
+        """Finds the pairs of rows of different nodes within the radius on the same timestamp. The pairs are ordered by the
+        first appearance of their timestamp, then by the order of the rows on the trace.
+
+        If a `tolerance` is given, the rows are compared on time bins of `tolerance` seconds instead (see `detect_contacts`),
+        and the pairs are oriented so the first node has the smaller identifier.
+
+        Returns:
+
+        `first` (numpy.ndarray): Rows of the first node of each contact.
+        `second` (numpy.ndarray): Rows of the second node of each contact.
+        `timestamps` (numpy.ndarray): Timestamp of each contact.
+        """
+        first, second, codes = cls.search_pairs(df, points, radius, tolerance, window)
+
+        first, second, timestamps, _ = cls.select_pairs(df, first, second, codes, tolerance, window)
+
+        return [first, second, timestamps]
+
+    @classmethod
+    def search_pairs(cls, df, points, radius, tolerance=None, window='bin'):
+        """Finds the pairs of rows that are compared by `contact_pairs` and are within the radius.
+
+        Returns:
+
+        `first` (numpy.ndarray): Rows of the first point of each pair.
+        `second` (numpy.ndarray): Rows of the second point of each pair.
+        `codes` (numpy.ndarray): Timestamp code (or time bin) of each row of the trace.
+        """
+        timestamps = df.timestamp.values.astype(np.float64)
+
+        if tolerance is None:
+            codes, _ = pd.factorize(timestamps)
+        else:
+            codes = np.floor(timestamps / tolerance).astype(np.int64)
+
+        # A single sort by time, after that each group is a contiguous slice of rows
+        rows = np.argsort(codes, kind='stable')
+
+        first, second = cls.neighbor_pairs(points[rows], codes[rows], radius)
+
+        if tolerance is not None and window == 'sliding':
+            previous_first, previous_second = cls.adjacent_pairs(points[rows], codes[rows], radius)
+            first = np.r_[first, previous_first]
+            second = np.r_[second, previous_second]
+
+        return [rows[first], rows[second], codes]
+
+    def select_pairs(df, first, second, codes, tolerance=None, window='bin'):
+        """Selects the pairs of `search_pairs` that are contacts: the pairs of different nodes and, with a `tolerance`, a
+        single pair of each pair of nodes per bin or the pairs close enough in time on the sliding window.
+
+        Returns:
+
+        `first` (numpy.ndarray): Rows of the first node of each contact.
+        `second` (numpy.ndarray): Rows of the second node of each contact.
+        `timestamps` (numpy.ndarray): Timestamp of each contact.
+        `selected` (numpy.ndarray): Position of each contact on the given `first` and `second` arrays.
+        """
+        timestamps = df.timestamp.values.astype(np.float64)
+        ids = df.id.values
+
+        selected = np.flatnonzero(ids[first] != ids[second])
+
+        if tolerance is None:
+            return [first[selected], second[selected], timestamps[first[selected]], selected]
+
+        # The contacts are oriented so the first node has the smaller identifier
+        first, second = first[selected], second[selected]
+        swap = ids[first] > ids[second]
+        first, second = np.where(swap, second, first), np.where(swap, first, second)
+
+        if window == 'sliding':
+            within = np.abs(timestamps[first] - timestamps[second]) <= tolerance
+            selected, first, second = selected[within], first[within], second[within]
+            contact_timestamps = np.minimum(timestamps[first], timestamps[second])
+        else:
+            # A single contact of each pair of nodes per bin, timestamped on the start of the bin
+            contact_timestamps = codes[first] * tolerance
+            keys = pd.MultiIndex.from_arrays([codes[first], ids[first], ids[second]])
+            unique = ~keys.duplicated()
+            selected, first, second, contact_timestamps = selected[unique], first[unique], second[unique], contact_timestamps[unique]
+
+        # The rows break the ties, so the order does not depend on the order of the search results
+        order = np.lexsort((second, first, ids[second], ids[first], contact_timestamps))
+
+        return [first[order], second[order], contact_timestamps[order], selected[order]]
+
+    def contacts_frame(df, first, second, timestamps):
+        """Builds the contacts DataFrame from the rows of each contact.
+        """
+        x = df.x.values
+        y = df.y.values
+
+        return pd.DataFrame({
+            'id1': df.id.values[first],
+            'id2': df.id.values[second],
+            'x1': x[first],
+            'y1': y[first],
+            'x2': x[second],
+            'y2': y[second],
+            'timestamp': timestamps
+        })
+
+    def contact_points(df, radius, dist_type):
+        """Returns the coordinates searched by the KD-tree and the radius on their scale.
+        """
+        if dist_type.lower() == 'haversine':
+            return [to_unit_vectors(df.x.values, df.y.values), chord_length(radius)]
+        elif dist_type.lower() == 'euclidean':
+            return [np.column_stack((df.x.values, df.y.values)).astype(np.float64), radius]
+
+        raise ValueError(f'Unsupported distance formula: {dist_type}. Supported types are: Haversine and Euclidean.')
+
+    @classmethod
+    def time_chunks(cls, df, tolerance, window, chunk_rows):
+        """Splits the rows of the trace in chunks of approximately `chunk_rows` rows along the time axis, without
+        splitting the rows of a timestamp (or time bin) between two chunks.
+
+        Returns:
+
+        `chunks` (tuple[]): Rows of each chunk (in the order of the trace) and its last time bin. On the sliding
+            window, each chunk also holds the rows of the bin after its last bin, and the last bin is used to
+            drop the pairs timestamped on that bin, so every contact is written by the chunk that owns the bin of
+            its timestamp and the chunks stay in time order. Otherwise, the last bin is `None`.
+        """
+        timestamps = df.timestamp.values.astype(np.float64)
+        keys = timestamps if tolerance is None else np.floor(timestamps / tolerance)
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        # Chunks only start on the first row of a key
+        targets = sorted_keys[np.arange(0, len(keys), chunk_rows)]
+        bounds = np.r_[np.unique(np.searchsorted(sorted_keys, targets, side='left')), len(keys)]
+
+        chunks = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            last_bin = None
+
+            if tolerance is not None and window == 'sliding':
+                last_bin = sorted_keys[end - 1]
+                end = np.searchsorted(sorted_keys, last_bin + 1, side='right')
+
+            chunks.append((np.sort(order[start:end]), last_bin))
+
+        return chunks
+
+    @classmethod
+    def detect_chunk(cls, chunk, radius, dist_type, tolerance=None, window='bin', last_bin=None):
+        """Detects the contacts of a time chunk of the trace given by `time_chunks`.
+        """
+        points, search_radius = cls.contact_points(chunk, radius, dist_type)
+
+        first, second, timestamps = cls.contact_pairs(chunk, points, search_radius, tolerance, window)
+
+        if last_bin is not None:
+            # The contacts are timestamped on their earliest row, so pairs between rows of the next bin belong to the next chunk
+            bins = np.floor(chunk.timestamp.values.astype(np.float64) / tolerance)
+            own = np.minimum(bins[first], bins[second]) <= last_bin
+            first, second, timestamps = first[own], second[own], timestamps[own]
+
+        return Converters.keep_schema(cls.contacts_frame(chunk, first, second, timestamps), chunk)
+
+    @classmethod
+    def spill_contacts(cls, df, radius, dist_type, tolerance, window, spill_dir, processes=None, chunk_rows=1000000):
+        """Detects the contacts on a pool of processes, each one handling time chunks of the trace and writing their
+        contacts straight to the disk, so the contacts are never held together in memory.
+
+        Returns:
+
+        `store` (mobvis.utils.ContactStore.ContactStore): Lazy handle of the written contacts.
+        """
+        os.makedirs(spill_dir, exist_ok=True)
+
+        chunks = cls.time_chunks(df, tolerance, window, chunk_rows)
 
-            if dist <= radius:
-                if row1[0] != row2[0]:
-                    edges.append((row1[0], row2[0], lat1, lon1, lat2, lon2, row1[1]))
+        # The chunks are sliced lazily and fed one by one, so only about one chunk per process is copied at a time.
+        # The part number travels with each chunk, so the parts keep the time order of the chunks
+        args = ((df.iloc[rows], radius, dist_type, tolerance, window, last_bin, ContactStore.part_path(spill_dir, i))
+                for i, (rows, last_bin) in enumerate(chunks))
 
-        contacts_df = pd.DataFrame(edges, columns=['id1', 'id2', 'x1', 'y1', 'x2', 'y2', 'timestamp'])
+        with Pool(processes) as pool:
+            counts = list(pool.imap(contacts_worker, args))
 
-        return contacts_df
+        print(f'{len(counts)} chunks written to {spill_dir}')
+
+        return ContactStore(spill_dir)
+
+    @classmethod
+    def euclidean_contact_detection(cls, df, radius, tolerance=None, window='bin'):
+        """Apply the contact detection on all pairs of the trace by using the Euclidean formula.
+        """
+        points = np.column_stack((df.x.values, df.y.values)).astype(np.float64)
+
+        first, second, timestamps = cls.contact_pairs(df, points, radius, tolerance, window)
+
+        return cls.contacts_frame(df, first, second, timestamps)
+
+    @classmethod
+    def haversine_contact_detection(cls, df, radius, tolerance=None, window='bin'):
+        """Apply the contact detection on all pairs of the trace by using the Haversine formula. The coordinates are
+        projected once to 3D unit vectors, where the chord distance between two points only grows with their Haversine
+        distance, so searching the chord of the metre radius gives the same contacts without trigonometry per pair.
+        """
+        points = to_unit_vectors(df.x.values, df.y.values)
+
+        first, second, timestamps = cls.contact_pairs(df, points, chord_length(radius), tolerance, window)
+
+        return cls.contacts_frame(df, first, second, timestamps)
+
+    def check_window(tolerance, window):
+        """Validates the time tolerance and window of the contact detection.
+        """
+        if tolerance is not None and tolerance <= 0:
+            raise ValueError('The contact tolerance must be positive.')
+        if window not in ('bin', 'sliding'):
+            raise ValueError(f'Unsupported contact window: {window}. Supported windows are: bin and sliding.')
 
     @classmethod
     @Timer.timed
-    def detect_contacts(cls, df, radius, dist_type):
+    def detect_contacts(cls, df, radius, dist_type, tolerance=None, window='bin', spill_dir=None, processes=None, chunk_rows=1000000, cache=None):
         """Detects contacts between each pair of nodes on the trace.
 
         Params:
@@ -66,37 +296,224 @@ class Contacts:
         `df` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
         `radius` (float): Contact radius of the nodes.
         `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+        `tolerance` (float): If specified, records of unsynchronized nodes are compared when they are close in time, instead of
+            only on equal timestamps. The time axis is split in bins of `tolerance` seconds.
+        `window` (str): How the records are compared when a `tolerance` is given. Supported windows are:
+            - bin: records of the same bin are compared, and each pair of nodes has up to one contact per bin, timestamped on the start of the bin.
+            - sliding: every pair of records at most `tolerance` seconds apart is compared, and each matching pair is a contact, timestamped on its earlier record.
+        `spill_dir` (str): If specified, the time axis of the trace is split in chunks that are processed by a pool of processes, and the
+            contacts of each chunk are written to this directory as soon as they are found. If `True`, a temporary directory is created.
+        `processes` (int): Number of workers of the pool used with `spill_dir`. If `None`, the number of CPUs is used.
+        `chunk_rows` (int): Approximated number of rows of the trace on each chunk used with `spill_dir`.
+        `cache` (mobvis.utils.Cache.ResultCache): If specified, the result is loaded from (or saved to) this on-disk cache.
 
         Returns:
 
-        `contacts` (pandas.DataFrame): DataFrame containing all the contacts of the trace.
+        `contacts` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): DataFrame containing all the contacts of the trace, or
+            a lazy handle of the contacts written to `spill_dir`. With a `tolerance`, id1 is always the smaller identifier.
             - id1: First node identifier
             - id2: Second node identifier
             - x1: x coordinate of the first node
             - y1: y coordinate of the first node
             - x2: x coordinate of the second node
             - y2: y coordinate of the second node
+            - timestamp: Timestamp of the contact
         """
+        cls.check_window(tolerance, window)
+
+        if spill_dir is not None:
+            if spill_dir is True:
+                spill_dir = tempfile.mkdtemp(prefix='mobvis_contacts_')
+
+            print('Detecting the contacts between the nodes...')
+            return cls.spill_contacts(df, radius, dist_type, tolerance, window, spill_dir, processes, chunk_rows)
+
+        if cache is not None:
+            params = {'radius': radius, 'dist_type': dist_type.lower()}
+            if tolerance is not None:
+                params.update({'tolerance': tolerance, 'window': window})
+            return cache.get_or_compute('detect_contacts', df, params, lambda: cls.detect_contacts(df, radius, dist_type, tolerance, window))
 
         print('Detecting the contacts between the nodes...')
         print(f'\nParameters:\nContact Radius: {radius}\nDistance Formula: {dist_type}')
-
-        timestamps = df.timestamp.unique()
-        contacts = pd.DataFrame(columns=['id1', 'id2', 'x1', 'y1', 'x2', 'y2'])
+        if tolerance is not None:
+            print(f'Time Tolerance: {tolerance}\nWindow: {window}')
 
         if dist_type.lower() == 'haversine':
-            for t in timestamps:
-                filtered_df = df.loc[df.timestamp == t]
-                contacts = pd.concat([contacts, cls.haversine_contact_detection(filtered_df, radius)], ignore_index=True)
+            contacts = cls.haversine_contact_detection(df, radius, tolerance, window)
         elif dist_type.lower() == 'euclidean':
-            for t in timestamps:
-                filtered_df = df.loc[df.timestamp == t]
-                contacts = pd.concat([contacts, cls.euclidean_contact_detection(filtered_df, radius)], ignore_index=True)
-                    
+            contacts = cls.euclidean_contact_detection(df, radius, tolerance, window)
+        else:
+            raise ValueError(f'Unsupported distance formula: {dist_type}. Supported types are: Haversine and Euclidean.')
+
+        contacts = Converters.keep_schema(contacts, df)
 
         print('Contacts Detected!')
             
         print(contacts.head())
         print(f'Number of contacts: {len(contacts)}')
 
-        return contacts
\ No newline at end of file
+        return contacts
+
+    @classmethod
+    @Timer.timed
+    def detect_contacts_radii(cls, df, radii, dist_type, tolerance=None, window='bin', gap=None):
+        """Detects the contacts of the trace for several contact radii with a single neighbor search. The pairs are searched
+        once with the largest radius, their distances are computed once, and the contacts of each radius are selected by
+        thresholding the distances, so a sweep costs about the same as one `detect_contacts` run.
+
+        Params:
+
+        `df` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+        `radii` (float[]): Contact radii of the nodes.
+        `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+        `tolerance` (float): Time tolerance of unsynchronized nodes. See `detect_contacts`.
+        `window` (str): Time window used with the `tolerance`. See `detect_contacts`.
+        `gap` (float): If specified, the contacts of each radius are compacted in contact episodes with this gap (see `find_episodes`).
+
+        Returns:
+
+        `contacts` (dict): Maps each radius to the DataFrame of its contacts, with the columns of `detect_contacts` and the
+            `distance` between the nodes of each contact, or to its DataFrame of episodes if `gap` is given.
+        """
+        radii = list(radii)
+
+        if len(radii) == 0:
+            raise ValueError('At least one contact radius must be given.')
+
+        cls.check_window(tolerance, window)
+
+        print('Detecting the contacts between the nodes for multiple radii...')
+        print(f'\nParameters:\nContact Radii: {radii}\nDistance Formula: {dist_type}')
+
+        points, search_radius = cls.contact_points(df, max(radii), dist_type)
+        is_haversine = dist_type.lower() == 'haversine'
+
+        first, second, codes = cls.search_pairs(df, points, search_radius, tolerance, window)
+
+        # Squared distances of the pairs (between the unit vectors on the Haversine formula), computed once for all the radii
+        squared = ((points[first] - points[second]) ** 2).sum(axis=1)
+        distances = arc_length(np.sqrt(squared)) if is_haversine else np.sqrt(squared)
+
+        contacts = {}
+
+        for radius in radii:
+            threshold = chord_length(radius) if is_haversine else radius
+            within = np.flatnonzero(squared <= threshold ** 2)
+
+            radius_first, radius_second, timestamps, selected = cls.select_pairs(df, first[within], second[within], codes, tolerance, window)
+
+            radius_contacts = cls.contacts_frame(df, radius_first, radius_second, timestamps)
+            radius_contacts['distance'] = distances[within[selected]]
+            radius_contacts = Converters.keep_schema(radius_contacts, df)
+
+            print(f'Radius {radius}: {len(radius_contacts)} contacts')
+
+            contacts[radius] = cls.find_episodes(radius_contacts, gap) if gap is not None else radius_contacts
+
+        return contacts
+
+    def merge_episodes(id1, id2, start, end, samples, gap):
+        """Merges time intervals of the same pair of nodes that are at most `gap` seconds apart. The pairs are
+        turned into integer keys, sorted once with the start of the intervals, and split where the key changes
+        or the next interval starts more than `gap` seconds after the previous ones end.
+        """
+        codes, nodes = pd.factorize(np.r_[id1, id2], sort=True)
+        keys = codes[:len(id1)].astype(np.int64) * len(nodes) + codes[len(id1):]
+
+        time_codes, times = pd.factorize(start, sort=True)
+
+        if len(nodes) ** 2 * max(len(times), 1) < np.iinfo(np.int64).max:
+            # A single sort of the pair and time codes combined, which is much faster than a lexsort
+            order = np.argsort(keys * len(times) + time_codes)
+        else:
+            order = np.lexsort((start, keys))
+        keys, start, end, samples = keys[order], start[order], end[order], samples[order]
+
+        # Latest end of the previous intervals of each pair. Raw contacts are single instants, so the intervals of a pair never overlap
+        previous_end = pd.Series(end).groupby(keys).cummax().values if np.any(end > start) else end
+
+        new_episode = np.r_[True, (keys[1:] != keys[:-1]) | (start[1:] - previous_end[:-1] > gap)] if len(keys) else np.array([], dtype=bool)
+        firsts = np.flatnonzero(new_episode)
+
+        if len(firsts) == 0:
+            return pd.DataFrame({'id1': id1[:0], 'id2': id2[:0], 'start': start, 'end': end, 'samples': samples})
+
+        episode_keys = keys[firsts]
+
+        return pd.DataFrame({
+            'id1': nodes[episode_keys // len(nodes)],
+            'id2': nodes[episode_keys % len(nodes)],
+            'start': start[firsts],
+            'end': np.maximum.reduceat(end, firsts),
+            'samples': np.add.reduceat(samples, firsts)
+        })
+
+    @classmethod
+    def episode_chunk(cls, contacts, gap):
+        """Compacts a DataFrame of contacts in episodes, with the pairs oriented so id1 is the smaller identifier.
+        """
+        id1 = contacts.id1.values
+        id2 = contacts.id2.values
+        timestamps = contacts.timestamp.values.astype(np.float64)
+
+        return cls.merge_episodes(np.minimum(id1, id2), np.maximum(id1, id2), timestamps, timestamps, np.ones(len(timestamps), dtype=np.int64), gap)
+
+    @classmethod
+    @Timer.timed
+    def find_episodes(cls, contacts, gap=30):
+        """Compacts the contacts in contact episodes: runs of contacts of the same pair of nodes where consecutive
+        contacts are at most `gap` seconds apart. The contacts of (a, b) and (b, a) are considered the same pair.
+
+        Params:
+
+        `contacts` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts extracted by `detect_contacts`. Contacts
+            spilled to disk are compacted part by part, and the episodes of consecutive parts are merged.
+        `gap` (float): Largest time between two contacts of the same episode, in seconds.
+
+        Returns:
+
+        `episodes` (pandas.DataFrame): DataFrame with one row per episode, ordered by pair and time, as shown below:
+            - id1: Smaller node identifier of the pair
+            - id2: Larger node identifier of the pair
+            - start: Timestamp of the first contact of the episode
+            - end: Timestamp of the last contact of the episode
+            - samples: Number of contacts of the episode
+        """
+        print('Finding the contact episodes...')
+
+        if isinstance(contacts, ContactStore):
+            parts = [cls.episode_chunk(chunk, gap) for chunk in contacts.chunks(columns=['id1', 'id2', 'timestamp'])]
+            parts = [part for part in parts if len(part)]
+
+            if len(parts) > 1:
+                episodes = pd.concat(parts, ignore_index=True)
+                episodes = cls.merge_episodes(episodes.id1.values, episodes.id2.values, episodes.start.values, episodes.end.values, episodes.samples.values, gap)
+            elif parts:
+                episodes = parts[0]
+            else:
+                episodes = pd.DataFrame(columns=['id1', 'id2', 'start', 'end', 'samples'])
+        else:
+            episodes = cls.episode_chunk(contacts, gap)
+
+        print(f'Number of episodes: {len(episodes)}')
+
+        return episodes
+
+
+def contacts_worker(args):
+    """ Detects the contacts of a time chunk on a worker process and saves them as a part of the contacts store.
+
+    ### Parameters:
+
+    `args` (tuple): Chunk of the trace, radius, distance type, tolerance, window, last bin of the chunk and path of the part.
+
+    ### Returns:
+
+    `count` (int): Number of contacts of the chunk.
+    """
+    chunk, radius, dist_type, tolerance, window, last_bin, path = args
+
+    contacts = Contacts.detect_chunk(chunk, radius, dist_type, tolerance, window, last_bin)
+
+    return ContactStore.write_part(contacts, path)
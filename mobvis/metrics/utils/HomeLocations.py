@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 
+from datetime import datetime
+
 from concurrent.futures import ThreadPoolExecutor
 
 from mobvis.utils import Timer
+from mobvis.utils import Converters
 
 class HomeLocations:
     """Class that contains the method for finding the Home Locations of a given set of
@@ -25,12 +29,22 @@ class HomeLocations:
 
     @classmethod
     @Timer.timed
-    def find_homes(cls, trace_loc):
-        """Finds the Home-locations of all the nodes of a trace.
+    def find_homes(cls, trace_loc, rule='dwell', night_window=(22, 6), origin=None, cache=None):
+        """Finds the Home-locations of all the nodes of a trace. The trace is split in runs of consecutive
+        points on the same (id, sl) pair, and the dwell time of each run is reduced on a single columnar
+        pass, so no rows are iterated.
         
         Params:
 
         `trace_loc` (pandas.DataFrame): Geo-locations DataFrame of the trace extracted by the mobvis.metrics.utils.Locations module.
+        `rule` (str): Home criterion. Supported rules are:
+            - dwell: the location of the run with the longest dwell time.
+            - night: the location of the run with the longest dwell time inside of the `night_window`. Nodes that
+              are never seen at night fall back to the dwell rule.
+        `night_window` (int[]): Start and end hours of the night, on the clock of the trace. The window may wrap around midnight.
+        `origin` (float | str): Timestamp (or datetime) of the time zero of the trace, the same given to the parser. If `None`,
+            the time zero is considered to be at midnight.
+        `cache` (mobvis.utils.Cache.ResultCache): If specified, the result is loaded from (or saved to) this on-disk cache.
         
         Returns:
 
@@ -40,46 +54,89 @@ class HomeLocations:
             - x: x coordinate of the location
             - y: y coordinate of the location
         """
+        if rule not in ('dwell', 'night'):
+            raise ValueError(f'Unsupported home rule: {rule}. Supported rules are: dwell and night.')
+
+        if cache is not None:
+            params = {} if rule == 'dwell' else {'rule': rule, 'night_window': tuple(night_window), 'origin': str(origin)}
+            return cache.get_or_compute('find_homes', trace_loc, params, lambda: cls.find_homes(trace_loc, rule, night_window, origin))
+
         print('Finding the Home Locations...')
 
-        homes = pd.DataFrame(columns=['id', 'home_location', 'x', 'y'])
-        prev_row = trace_loc.iloc[0]
-        longer_stay_time = 0
-        stay_time = 0
-        current_home = trace_loc.iloc[0]
-        
-        for index, row in trace_loc.iloc[1:].iterrows():
-            if row.id == prev_row.id:
-                if row.sl == prev_row.sl:
-                    stay_time += (row.timestamp - prev_row.timestamp)
-                else:
-                    if stay_time > longer_stay_time:
-                        longer_stay_time = stay_time
-                        current_home = prev_row
-                    
-                    stay_time = 0
-            else:
-                new_row = pd.DataFrame({
-                    'id': [prev_row.id],
-                    'home_location': [current_home.sl],
-                    'x': [current_home.x],
-                    'y': [current_home.y]
-                })
-                homes = pd.concat([homes, new_row], ignore_index=True)
-                
-                current_home = row
-                stay_time = 0
-                longer_stay_time = 0
-                
-            prev_row = row
-
-        new_row = pd.DataFrame({
-            'id': [prev_row.id],
-            'home_location': [current_home.sl],
-            'x': [current_home.x],
-            'y': [current_home.y]
+        ids = trace_loc.id.values
+        sls = trace_loc.sl.values
+        timestamps = trace_loc.timestamp.values.astype(np.float64)
+
+        # Runs of consecutive points on the same (id, sl) pair
+        starts = np.flatnonzero(np.r_[True, (ids[1:] != ids[:-1]) | (sls[1:] != sls[:-1])])
+        ends = np.r_[starts[1:], len(ids)] - 1
+        dwell = timestamps[ends] - timestamps[starts]
+
+        node_starts = np.flatnonzero(np.r_[True, ids[starts][1:] != ids[starts][:-1]])
+
+        homes = cls.longest_runs(node_starts, dwell)
+
+        if rule == 'night':
+            night = cls.night_seconds(timestamps[ends], night_window, origin) - cls.night_seconds(timestamps[starts], night_window, origin)
+            night_homes = cls.longest_runs(node_starts, night)
+            homes = np.where(night_homes >= 0, night_homes, homes)
+
+        # The home is at the last point of the chosen run. Nodes without dwell time keep their first point
+        rows = np.where(homes >= 0, ends[np.maximum(homes, 0)], starts[node_starts])
+
+        homes = pd.DataFrame({
+            'id': ids[rows],
+            'home_location': sls[rows],
+            'x': trace_loc.x.values[rows],
+            'y': trace_loc.y.values[rows]
         })
-        homes = pd.concat([homes, new_row], ignore_index=True)
-        
+        homes = Converters.keep_schema(homes, trace_loc)
+
         print('Home locations found!')
-        return homes
\ No newline at end of file
+        return homes
+
+    def longest_runs(node_starts, values):
+        """Returns the position of the run with the largest positive value of each node (the first one on ties), or -1
+        if no run of the node has a positive value.
+        """
+        if len(values) == 0:
+            return np.array([], dtype=np.int64)
+
+        node_max = np.maximum.reduceat(values, node_starts)
+        node_of_run = np.repeat(np.arange(len(node_starts)), np.diff(np.r_[node_starts, len(values)]))
+
+        # The first run that reaches the maximum of its node
+        is_max = values == node_max[node_of_run]
+        positions = np.flatnonzero(is_max)
+        first = positions[np.r_[True, node_of_run[positions][1:] != node_of_run[positions][:-1]]]
+
+        return np.where(node_max > 0, first, -1)
+
+    def night_seconds(timestamps, night_window, origin=None):
+        """Counts the seconds of night time between the time zero of the trace and each timestamp, so the night
+        time spent between two timestamps is the difference of their counts.
+        """
+        day = 24 * 3600
+        night_start = night_window[0] * 3600
+        night_end = night_window[1] * 3600
+
+        if origin is None:
+            offset = 0.0
+        elif isinstance(origin, (str, datetime)):
+            offset = Converters.to_seconds(pd.Timestamp(origin))
+        else:
+            offset = float(origin)
+
+        # Clock times are counted from a midnight, so the offset only matters modulo one day
+        clock = timestamps + offset % day
+        days = np.floor(clock / day)
+        time_of_day = clock - days * day
+
+        if night_start <= night_end:
+            per_day = night_end - night_start
+            partial = np.clip(time_of_day - night_start, 0, per_day)
+        else:
+            per_day = night_end + day - night_start
+            partial = np.minimum(time_of_day, night_end) + np.maximum(time_of_day - night_start, 0)
+
+        return days * per_day + partial
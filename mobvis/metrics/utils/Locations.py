@@ -1,83 +1,197 @@
 import pandas as pd
 import numpy as np
 
-from scipy.spatial import distance
 from mobvis.utils import Timer
+from mobvis.utils import Converters
+from mobvis.utils.TraceIndex import TraceIndex
 
+from multiprocessing import Pool
 from multiprocessing.pool import ThreadPool
 
 from mobvis.utils.Utils import haversine
+from mobvis.utils.Utils import haversine_array
+
+from math import sqrt
 
 class Locations:
     def __init__(self):
         pass
 
+    # Number of points compared with the anchor on the first vectorized step of a Stay-location.
+    # The window doubles while all the compared points are still inside the Stay-location.
+    ANCHOR_WINDOW = 32
+
     def stay_locations_euclidean(trace, max_D):
         """Finds the Stay-locations for each node based on the Euclidean distance formula.
         """
-        sl_index = set()
-        list_of_sl = []
-        max_D = max_D
-        pm = 0
-        sl_index.add(pm)
-
-        for i in range(1, trace.shape[0]):
-            if distance.euclidean((trace.x[pm], trace.y[pm]), (trace.x[i], trace.y[i])) < max_D:
-                sl_index.add(i)
-            else:
-                list_of_sl.append(sl_index)
-                sl_index = set()
-                sl_index.add(i)
-                pm = i
-
-        list_of_sl.append(sl_index)
-
-        trace['sl'] = 0
-        count_sl = 0
-        for sl in list_of_sl:
-            trace.loc[list(sl), 'sl'] = count_sl
-            count_sl += 1
+        trace['sl'] = Locations.anchor_labels(trace.x.values, trace.y.values, max_D, 'euclidean')
         return trace
 
     def stay_locations_haversine(cls, trace, max_D):
         """Finds the Stay-locations for each node based on the Haversine distance formula.
         """
-        sl_index = set()
-        list_of_sl = []
-        max_D = max_D
-        pm = 0
-        sl_index.add(pm)
-
-        for i in range(1, trace.shape[0]):
-            if haversine(trace.x[pm], trace.y[pm], trace.x[i], trace.y[i]) < max_D:
-                sl_index.add(i)
-            else:
-                list_of_sl.append(sl_index)
-                sl_index = set()
-                sl_index.add(i)
-                pm = i
-
-        list_of_sl.append(sl_index)
-
-        trace['sl'] = 0
+        trace['sl'] = cls.anchor_labels(trace.x.values, trace.y.values, max_D, 'haversine')
+        return trace
+
+    @classmethod
+    def stay_location_labels(cls, ids, x, y, max_d, dist_type):
+        """Finds the Stay-locations of a whole trace at once, restarting the anchor at each node.
+
+        Params:
+
+        `ids` (numpy.ndarray): Node identifiers of the trace, with the rows of each node contiguous.
+        `x` (numpy.ndarray): x coordinates of the trace.
+        `y` (numpy.ndarray): y coordinates of the trace.
+        `max_d` (float): Maximum distance to a region be considered a Stay-location.
+        `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+
+        Returns:
+
+        `labels` (numpy.ndarray): Stay-location of each point, numbered from 0 on each node.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        labels = np.empty(len(x), dtype=np.int64)
+        starts = TraceIndex.node_starts(np.asarray(ids))
+
+        for start, end in zip(starts, np.r_[starts[1:], len(x)].astype(np.int64)):
+            labels[start:end] = cls.anchor_labels(x[start:end], y[start:end], max_d, dist_type)
+
+        return labels
+
+    @classmethod
+    def anchor_labels(cls, x, y, max_d, dist_type):
+        """Finds the Stay-locations of a single node. A Stay-location starts on an anchor point and
+        keeps all the following points closer than `max_d` to it, and the first point that is not
+        becomes the anchor of the next Stay-location.
+
+        The first point after the anchor is checked with scalar math, so points in movement cost
+        no array operations, and longer Stay-locations are found by comparing the anchor with
+        growing windows of points at once.
+        """
+        dist_type = dist_type.lower()
+
+        if dist_type == 'euclidean':
+            scalar = lambda xa, ya, xb, yb: sqrt((xa - xb) * (xa - xb) + (ya - yb) * (ya - yb))
+            vector = lambda xa, ya, xb, yb: np.sqrt((xa - xb) * (xa - xb) + (ya - yb) * (ya - yb))
+        elif dist_type == 'haversine':
+            scalar = haversine
+            vector = haversine_array
+        else:
+            raise ValueError(f'Unsupported distance formula: {dist_type}. Supported types are: Haversine and Euclidean.')
+
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        x_list = x.tolist()
+        y_list = y.tolist()
+
+        n = len(x_list)
+        labels = np.empty(n, dtype=np.int64)
+
+        anchor = 0
         count_sl = 0
-        for sl in list_of_sl:
-            trace.loc[list(sl), 'sl'] = count_sl
+
+        while anchor < n:
+            xa = x_list[anchor]
+            ya = y_list[anchor]
+            next_anchor = anchor + 1
+
+            if next_anchor < n and scalar(xa, ya, x_list[next_anchor], y_list[next_anchor]) < max_d:
+                next_anchor = n
+                low = anchor + 2
+                window = cls.ANCHOR_WINDOW
+
+                while low < n:
+                    high = min(low + window, n)
+                    outside = np.flatnonzero(~(vector(xa, ya, x[low:high], y[low:high]) < max_d))
+
+                    if outside.size:
+                        next_anchor = low + int(outside[0])
+                        break
+
+                    low = high
+                    window *= 2
+
+            labels[anchor:next_anchor] = count_sl
             count_sl += 1
-        return trace
+            anchor = next_anchor
+
+        return labels
 
     def geo_locations(trace, pause_threshold):
         """Determinates if the Stay-locations found are also Geo-locations.
         """
-        gl = trace.groupby('sl')['timestamp'].agg(np.ptp)
-        gl = gl>60 * pause_threshold
-        gl = gl.reset_index()
-        gl.columns = ['sl', 'gl']
-        
-        trace = trace.merge(gl, left_on='sl', right_on='sl')
+        codes, _ = pd.factorize(trace['sl'])
+
+        durations = trace.groupby(codes)['timestamp'].agg(np.ptp).values
+
+        trace['gl'] = (durations > 60 * pause_threshold)[codes]
         
         return trace
 
+    def stay_location_runs(ids, labels):
+        """Finds the start position of each Stay-location of a trace sorted by id. Since the labels
+        are given by an anchor, the points of each (id, sl) pair are always contiguous.
+        """
+        if len(labels) == 0:
+            return np.array([], dtype=np.int64)
+
+        return np.flatnonzero(np.r_[True, (ids[1:] != ids[:-1]) | (labels[1:] != labels[:-1])])
+
+    @classmethod
+    def stay_location_stats(cls, ids, labels, timestamps, x, y):
+        """Aggregates the points of every Stay-location of a trace in a single pass.
+
+        Params:
+
+        `ids` (numpy.ndarray): Node identifiers of the trace, sorted.
+        `labels` (numpy.ndarray): Stay-location labels given by `stay_location_labels`.
+        `timestamps` (numpy.ndarray): Timestamps of the trace.
+        `x` (numpy.ndarray): x coordinates of the trace.
+        `y` (numpy.ndarray): y coordinates of the trace.
+
+        Returns:
+
+        `starts` (numpy.ndarray): Start position of each Stay-location on the trace.
+        `stats` (pandas.DataFrame): One row per Stay-location, as shown below:
+            - id: Node identifier
+            - sl: Stay-location identifier
+            - x, y: Center of the Stay-location (mean of its points)
+            - max_x, min_x, max_y, min_y: Bounding box of the Stay-location
+            - first_timestamp, last_timestamp: Timestamps of the first and last points of the Stay-location
+            - duration: Difference between the largest and smallest timestamps of the Stay-location
+            - n_points: Number of points of the Stay-location
+        """
+        starts = cls.stay_location_runs(ids, labels)
+        columns = ['id', 'sl', 'x', 'y', 'max_x', 'min_x', 'max_y', 'min_y', 'first_timestamp', 'last_timestamp', 'duration', 'n_points']
+
+        if len(starts) == 0:
+            return [starts, pd.DataFrame(columns=columns)]
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        n_points = np.diff(np.r_[starts, len(labels)])
+
+        stats = pd.DataFrame({
+            'id': ids[starts],
+            'sl': labels[starts],
+            'x': np.add.reduceat(x, starts) / n_points,
+            'y': np.add.reduceat(y, starts) / n_points,
+            'max_x': np.maximum.reduceat(x, starts),
+            'min_x': np.minimum.reduceat(x, starts),
+            'max_y': np.maximum.reduceat(y, starts),
+            'min_y': np.minimum.reduceat(y, starts),
+            'first_timestamp': timestamps[starts],
+            'last_timestamp': timestamps[starts + n_points - 1],
+            'duration': np.maximum.reduceat(timestamps, starts) - np.minimum.reduceat(timestamps, starts),
+            'n_points': n_points
+        }, columns=columns)
+
+        return [starts, stats]
+
     @classmethod
     def multifinder_locations(cls, traces, max_distances, pause_thresholds, dist_types):
         print('Finding locations for multiple traces:\n')
@@ -93,7 +207,7 @@ class Locations:
 
     @classmethod
     @Timer.timed
-    def find_locations(cls, trace, max_d, pause_threshold, dist_type):
+    def find_locations(cls, trace, max_d, pause_threshold, dist_type, processes=None, cache=None):
         """Finds the Stay-locations and Geo-locations of all nodes of a trace.
         
         Params:
@@ -102,51 +216,144 @@ class Locations:
         `max_d` (float): Maximum distance to a region be considered a Stay-location.
         `pause_threshold` (float): Ammout of waiting time to the Stay-location be considered a Geo-location (in minutes).
         `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+        `processes` (int): If greater than 1, the trace is split in this number of shards of whole nodes, which are processed by a pool of processes.
+        `cache` (mobvis.utils.Cache.ResultCache): If specified, the result is loaded from (or saved to) this on-disk cache.
         
         Returns:
 
         `trace_loc` (pandas.DataFrame): The original input trace with the stay and geo locations defined as new columns.
-        `sl_centers` (pandas.DataFrame): The centers of the Stay-locations based on the value of all the points on that location.
+        `sl_centers` (pandas.DataFrame): The centers of the Geo-locations based on the value of all the points on that location, with their
+            bounding boxes and dwell statistics (first_timestamp, last_timestamp, duration and n_points).
         """
+        if cache is not None:
+            params = {'max_d': max_d, 'pause_threshold': pause_threshold, 'dist_type': dist_type.lower()}
+            return cache.get_or_compute('find_locations', trace, params, lambda: cls.find_locations(trace, max_d, pause_threshold, dist_type, processes))
+
         print('Finding the stay and geo locations...')
         print(f'\nParameters:\nMax Distance: {max_d}\nPause Threshold: {pause_threshold}\nDistance Formula: {dist_type}\n')
 
-        trace_loc = pd.DataFrame(columns=['id', 'x', 'y', 'sl', 'gl'])
-        sl_centers = pd.DataFrame(columns=['id', 'sl', 'x', 'y'])
+        if not trace.id.is_monotonic_increasing:
+            trace = trace.sort_values(by='id', kind='stable')
 
-        initial_id = int(trace.id[0])
+        if processes is not None and processes > 1:
+            shards = TraceIndex.from_trace(trace).shards(processes)
+            args = [(trace.iloc[rows], max_d, pause_threshold, dist_type) for rows in shards]
 
-        for i in range(initial_id, trace.id.max() + 1):
-            aux_trace = trace.loc[trace.id == i].reset_index()
+            with Pool(processes) as pool:
+                results = pool.starmap(cls.locate, args)
 
-            if dist_type.lower() == 'haversine':
-                aux_trace = cls.stay_locations_haversine(cls, aux_trace, max_d)
-            elif dist_type.lower() == 'euclidean':
-                aux_trace = cls.stay_locations_euclidean(aux_trace, max_d)
+            trace_loc = pd.concat([result[0] for result in results], ignore_index=True)
+            sl_centers = pd.concat([result[1] for result in results], ignore_index=True)
+        else:
+            [trace_loc, sl_centers] = cls.locate(trace, max_d, pause_threshold, dist_type)
+
+        trace_loc = Converters.keep_schema(trace_loc, trace)
+        sl_centers = Converters.keep_schema(sl_centers, trace)
 
-            aux_trace = cls.geo_locations(aux_trace, pause_threshold)
-            trace_loc =  pd.concat([trace_loc, aux_trace], ignore_index=True)
-        
-            aux_trace = trace_loc.loc[(trace_loc.gl == True) & (trace_loc.id == i)]
-
-            x = aux_trace.groupby('sl').x.mean()
-            y = aux_trace.groupby('sl').y.mean()
-            max_x = aux_trace.groupby('sl').x.max()
-            min_x = aux_trace.groupby('sl').x.min()
-            max_y = aux_trace.groupby('sl').y.max()
-            min_y = aux_trace.groupby('sl').y.min()
-
-            sl_centers = pd.concat([sl_centers, pd.DataFrame({
-                'id': i,
-                'sl': x.index,
-                'x': x.values,
-                'y': y.values,
-                'max_x': max_x.values,
-                'min_x': min_x.values,
-                'max_y': max_y.values,
-                'min_y': min_y.values
-            })], ignore_index=True)
-            
         print(trace_loc)
         print('Locations found!')
-        return [trace_loc, sl_centers]
\ No newline at end of file
+        return [trace_loc, sl_centers]
+
+    @classmethod
+    @Timer.timed
+    def sweep_locations(cls, trace, max_distances, pause_thresholds, dist_type, return_labels=False):
+        """Finds the Stay-locations and Geo-locations of a trace for every combination of the given
+        thresholds, to help choosing the `max_d` and `pause_threshold` parameters of `find_locations`.
+
+        The coordinate arrays are extracted once, the Stay-locations are found once per distance, and
+        the Geo-location flags of all the pause thresholds come from a single duration aggregation.
+
+        Params:
+
+        `trace` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+        `max_distances` (float[]): Maximum distances to a region be considered a Stay-location.
+        `pause_thresholds` (float[]): Ammouts of waiting time to the Stay-location be considered a Geo-location (in minutes).
+        `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+        `return_labels` (bool): If 'True', the Stay-location and Geo-location labels of every combination are also returned.
+
+        Returns:
+
+        `sweep` (pandas.DataFrame): One row per combination of thresholds, as shown below:
+            - max_d: Maximum distance of the combination
+            - pause_threshold: Pause threshold of the combination
+            - stay_locations: Number of Stay-locations
+            - geo_locations: Number of Geo-locations
+            - geo_locations_per_node: Mean number of Geo-locations of each node
+            - geo_points_ratio: Fraction of the trace points that are on a Geo-location
+            - mean_geo_duration: Mean duration of the Geo-locations (in seconds)
+        `labels` (dict): Only if `return_labels` is 'True'. Maps each (max_d, pause_threshold) pair to a DataFrame with the `sl` and `gl`
+            columns of the trace sorted by id.
+        """
+        print('Sweeping the stay and geo locations parameters...')
+        print(f'\nParameters:\nMax Distances: {max_distances}\nPause Thresholds: {pause_thresholds}\nDistance Formula: {dist_type}\n')
+
+        if not trace.id.is_monotonic_increasing:
+            trace = trace.sort_values(by='id', kind='stable')
+
+        ids = trace.id.values
+        x = trace.x.values.astype(np.float64)
+        y = trace.y.values.astype(np.float64)
+        timestamps = trace.timestamp.values.astype(np.float64)
+
+        n_nodes = len(TraceIndex.node_starts(ids))
+
+        rows = []
+        labels = {}
+
+        for max_d in max_distances:
+            sl = cls.stay_location_labels(ids, x, y, max_d, dist_type)
+            starts, stats = cls.stay_location_stats(ids, sl, timestamps, x, y)
+
+            durations = stats.duration.values.astype(np.float64)
+            n_points = stats.n_points.values.astype(np.int64)
+            point_runs = np.repeat(np.arange(len(starts)), n_points)
+
+            for pause_threshold in pause_thresholds:
+                gl = durations > 60 * pause_threshold
+
+                rows.append({
+                    'max_d': max_d,
+                    'pause_threshold': pause_threshold,
+                    'stay_locations': len(starts),
+                    'geo_locations': int(gl.sum()),
+                    'geo_locations_per_node': gl.sum() / n_nodes if n_nodes else 0.0,
+                    'geo_points_ratio': n_points[gl].sum() / len(ids) if len(ids) else 0.0,
+                    'mean_geo_duration': durations[gl].mean() if gl.any() else 0.0
+                })
+
+                if return_labels:
+                    labels[(max_d, pause_threshold)] = pd.DataFrame({'sl': sl, 'gl': gl[point_runs]}, index=trace.index)
+
+        sweep = pd.DataFrame(rows, columns=['max_d', 'pause_threshold', 'stay_locations', 'geo_locations', 'geo_locations_per_node', 'geo_points_ratio', 'mean_geo_duration'])
+
+        print(sweep)
+        print('Sweep finished!')
+
+        if return_labels:
+            return [sweep, labels]
+
+        return sweep
+
+    @classmethod
+    def locate(cls, trace, max_d, pause_threshold, dist_type):
+        """Finds the Stay-locations, Geo-locations and Stay-location centers of a trace sorted by id.
+        This is the work done by `find_locations` on each shard of the trace.
+        """
+        ids = trace.id.values
+        labels = cls.stay_location_labels(ids, trace.x.values, trace.y.values, max_d, dist_type)
+
+        starts, stats = cls.stay_location_stats(ids, labels, trace.timestamp.values, trace.x.values, trace.y.values)
+        gl = (stats.duration.values > 60 * pause_threshold).astype(bool)
+
+        trace_loc = trace.reset_index()
+        trace_loc['sl'] = labels
+        # Each point takes the Geo-location flag of its Stay-location
+        trace_loc['gl'] = gl[np.repeat(np.arange(len(starts)), stats.n_points.values.astype(np.int64))]
+
+        # Keeps the column order of the previous versions: id, x, y, sl, gl, followed by the other trace columns
+        columns = ['id', 'x', 'y', 'sl', 'gl']
+        trace_loc = trace_loc[columns + [column for column in trace_loc.columns if column not in columns]]
+
+        sl_centers = stats.loc[gl].reset_index(drop=True)
+
+        return [trace_loc, sl_centers]
@@ -4,6 +4,7 @@ from mobvis.metrics.spatial.VisitOrder import VisitOrder
 from mobvis.metrics.temporal.VisitTime import VisitTime
 from mobvis.metrics.temporal.TravelTime import TravelTime
 from mobvis.metrics.social.IntercontactTime import IntercontactTime
+from mobvis.metrics.social.ContactDuration import ContactDuration
 
 class MetricBuilder:
     """Factory pattern to create metrics based on user request.
@@ -23,7 +24,8 @@ class MetricBuilder:
             - Visit Order (VISO): trace_loc
             - Visit Time (VIST): trace_loc
             - Travel Time (TRVT): trace_loc
-            - Intercontact Time (INCO): contacts_df
+            - Intercontact Time (INCO): contacts_df, gap (optional)
+            - Contact Duration (CODU): contacts_df, gap (optional)
 
         Returns:
 
@@ -40,4 +42,6 @@ class MetricBuilder:
         if metric == 'TRVT':
             return TravelTime(trace_loc=kwargs.get('trace_loc'))
         if metric == 'INCO':
-            return IntercontactTime(contacts_df=kwargs.get('contacts_df'))
+            return IntercontactTime(contacts_df=kwargs.get('contacts_df'), gap=kwargs.get('gap', 30))
+        if metric == 'CODU':
+            return ContactDuration(contacts_df=kwargs.get('contacts_df'), gap=kwargs.get('gap', 30))
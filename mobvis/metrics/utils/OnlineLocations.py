@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from mobvis.metrics.utils.Locations import Locations
+from mobvis.utils.TraceIndex import TraceIndex
+
+class OnlineLocations:
+    """Incremental counterpart of `Locations.find_locations`, for live position feeds.
+
+       Batches of (id, timestamp, x, y) records are consumed as they arrive, and the Stay-locations
+       are emitted as soon as they are closed, that is, when a point of the node falls outside of
+       the Stay-location anchor. The same `max_d`, `pause_threshold` and `dist_type` semantics of the
+       batch version are used, so feeding a whole trace gives the same Stay-locations.
+
+       Only the open Stay-location of each active node is kept in memory: its anchor, entry
+       timestamp, running aggregates and the next Stay-location identifier of the node. Once a node
+       is released (by `flush` or `max_idle`), nothing of it is kept, so its identifiers restart at 0
+       if it comes back. Its Stay-locations are still told apart by their `first_timestamp`.
+    """
+    COLUMNS = ['id', 'sl', 'x', 'y', 'max_x', 'min_x', 'max_y', 'min_y', 'first_timestamp', 'last_timestamp', 'duration', 'n_points', 'gl']
+
+    def __init__(self, max_d, pause_threshold, dist_type, max_idle=None):
+        """ Creates the detector.
+
+        ### Attributes:
+
+        `max_d` (float): Maximum distance to a region be considered a Stay-location.
+        `pause_threshold` (float): Ammout of waiting time to the Stay-location be considered a Geo-location (in minutes).
+        `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+        `max_idle` (float): If specified, the open Stay-location of a node that sent no records for this number of seconds
+            (relative to the newest timestamp of the last batch) is closed and the node state (including its identifier
+            counter) is released.
+        """
+        self.max_d = max_d
+        self.pause_threshold = pause_threshold
+        self.dist_type = dist_type
+        self.max_idle = max_idle
+
+        # Open Stay-location of each active node
+        self.states = {}
+        # Next Stay-location identifier of each active node
+        self.next_sl = {}
+
+    def update(self, batch):
+        """ Consumes a batch of records and returns the Stay-locations closed by it.
+
+        ### Parameters:
+
+        `batch` (pandas.DataFrame): New records, with the id, timestamp, x and y columns. The records of each node must
+            arrive in timestamp order across the batches.
+
+        ### Returns:
+
+        `closed` (pandas.DataFrame): Stay-locations closed by the batch, with the same columns of `sl_centers` and the
+            `gl` flag, which is 'True' for the Geo-locations.
+        """
+        batch = batch.sort_values(by=['id', 'timestamp'], kind='stable')
+
+        timestamps = batch.timestamp.values.astype(np.float64)
+        x = batch.x.values.astype(np.float64)
+        y = batch.y.values.astype(np.float64)
+
+        closed = []
+
+        for node_id, rows in TraceIndex.from_trace(batch).items():
+            closed.extend(self.update_node(node_id, timestamps[rows], x[rows], y[rows]))
+
+        if self.max_idle is not None and len(timestamps):
+            newest = timestamps.max()
+            idle = [node_id for node_id, state in self.states.items() if newest - state['last_timestamp'] > self.max_idle]
+            closed.extend(self.close(idle))
+
+        return self.to_frame(closed)
+
+    def flush(self, ids=None):
+        """ Closes the open Stay-locations, for example at the end of the feed.
+
+        ### Parameters:
+
+        `ids` (int[]): If specified, only the Stay-locations of these nodes are closed.
+
+        ### Returns:
+
+        `closed` (pandas.DataFrame): The closed Stay-locations.
+        """
+        return self.to_frame(self.close(list(self.states) if ids is None else ids))
+
+    def close(self, ids):
+        """ Removes the open Stay-locations of the given nodes and returns them, releasing the nodes.
+        """
+        closed = [self.states.pop(node_id) for node_id in ids if node_id in self.states]
+
+        for run in closed:
+            self.next_sl.pop(run['id'], None)
+
+        return closed
+
+    def update_node(self, node_id, timestamps, x, y):
+        """ Adds the records of a node to its state, returning the Stay-locations closed by them.
+        """
+        state = self.states.get(node_id)
+
+        if state is not None:
+            # The anchor of the open Stay-location is prepended, so label 0 continues it
+            labels = Locations.anchor_labels(np.r_[state['anchor_x'], x], np.r_[state['anchor_y'], y], self.max_d, self.dist_type)[1:]
+        else:
+            labels = Locations.anchor_labels(x, y, self.max_d, self.dist_type) + 1
+
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        ends = np.r_[starts[1:], len(labels)]
+
+        runs = [] if state is None else [state]
+
+        for start, end, label in zip(starts.tolist(), ends.tolist(), labels[starts].tolist()):
+            if label == 0:
+                self.extend(state, timestamps[start:end], x[start:end], y[start:end])
+                continue
+
+            run = {
+                'id': node_id,
+                'sl': self.next_sl.get(node_id, 0),
+                'anchor_x': x[start],
+                'anchor_y': y[start],
+                'first_timestamp': timestamps[start],
+                'n_points': 0,
+                'sum_x': 0.0,
+                'sum_y': 0.0,
+                'max_x': -np.inf,
+                'min_x': np.inf,
+                'max_y': -np.inf,
+                'min_y': np.inf,
+                'max_timestamp': -np.inf,
+                'min_timestamp': np.inf
+            }
+            self.next_sl[node_id] = run['sl'] + 1
+
+            self.extend(run, timestamps[start:end], x[start:end], y[start:end])
+            runs.append(run)
+
+        self.states[node_id] = runs[-1]
+
+        return runs[:-1]
+
+    def extend(self, run, timestamps, x, y):
+        """ Adds points to the running aggregates of a Stay-location.
+        """
+        run['n_points'] += len(x)
+        run['sum_x'] += x.sum()
+        run['sum_y'] += y.sum()
+        run['max_x'] = max(run['max_x'], x.max())
+        run['min_x'] = min(run['min_x'], x.min())
+        run['max_y'] = max(run['max_y'], y.max())
+        run['min_y'] = min(run['min_y'], y.min())
+        run['max_timestamp'] = max(run['max_timestamp'], timestamps.max())
+        run['min_timestamp'] = min(run['min_timestamp'], timestamps.min())
+        run['last_timestamp'] = timestamps[-1]
+
+    def to_frame(self, runs):
+        """ Converts closed Stay-locations to a DataFrame.
+        """
+        rows = []
+
+        for run in runs:
+            duration = run['max_timestamp'] - run['min_timestamp']
+
+            rows.append((
+                run['id'],
+                run['sl'],
+                run['sum_x'] / run['n_points'],
+                run['sum_y'] / run['n_points'],
+                run['max_x'],
+                run['min_x'],
+                run['max_y'],
+                run['min_y'],
+                run['first_timestamp'],
+                run['last_timestamp'],
+                duration,
+                run['n_points'],
+                duration > 60 * self.pause_threshold
+            ))
+
+        return pd.DataFrame(rows, columns=self.COLUMNS)
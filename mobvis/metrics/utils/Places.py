@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from mobvis.utils import Timer
+from mobvis.utils.Utils import chord_length
+from mobvis.utils.Utils import to_unit_vectors
+
+class Places:
+    """Contains the methods for merging the Geo-locations of all the nodes of a trace into shared places.
+    """
+    def __init__(self):
+        pass
+
+    def center_points(sl_centers, dist_type):
+        """Returns the coordinates used by the spatial index, and a function that converts a distance to its scale.
+        """
+        if dist_type.lower() == 'euclidean':
+            return [sl_centers[['x', 'y']].values.astype(np.float64), lambda radius: radius]
+        elif dist_type.lower() == 'haversine':
+            return [to_unit_vectors(sl_centers.x.values, sl_centers.y.values), chord_length]
+
+        raise ValueError(f'Unsupported distance formula: {dist_type}. Supported types are: Haversine and Euclidean.')
+
+    @classmethod
+    @Timer.timed
+    def find_places(cls, trace_loc, sl_centers, radius, dist_type):
+        """Merges the Geo-location centers of all the nodes into shared places. Two centers closer than
+        `radius` are on the same place, and so are all the centers chained by such pairs. The pairs are
+        found with a KD-tree, so the merge does not compare every pair of centers.
+
+        Params:
+
+        `trace_loc` (pandas.DataFrame): Geo-locations DataFrame of the trace extracted by the mobvis.metrics.utils.Locations module.
+        `sl_centers` (pandas.DataFrame): Centers of the Geo-locations extracted by the mobvis.metrics.utils.Locations module.
+        `radius` (float): Maximum distance between two centers of the same place.
+        `dist_type` (str): Distance formula. Supported types are: Haversine and Euclidean.
+
+        Returns:
+
+        `trace_loc` (pandas.DataFrame): Copy of `trace_loc` with the `place_id` column. Points outside of Geo-locations have place_id -1.
+        `sl_centers` (pandas.DataFrame): Copy of `sl_centers` with the `place_id` column.
+        `places` (pandas.DataFrame): One row per place, as shown below:
+            - place_id: Place identifier
+            - x: x coordinate of the place (mean of its centers)
+            - y: y coordinate of the place (mean of its centers)
+            - n_nodes: Number of different nodes that visited the place
+            - n_visits: Number of Geo-locations on the place
+        """
+        print('Finding the shared places...')
+        print(f'\nParameters:\nRadius: {radius}\nDistance Formula: {dist_type}\n')
+
+        points, scale = cls.center_points(sl_centers, dist_type)
+        n = len(points)
+
+        if n > 0:
+            pairs = cKDTree(points).query_pairs(scale(radius), output_type='ndarray')
+            graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+            _, place_ids = connected_components(graph, directed=False)
+        else:
+            place_ids = np.array([], dtype=np.int64)
+
+        sl_centers = sl_centers.copy()
+        sl_centers['place_id'] = place_ids
+
+        # Each point takes the place of its Geo-location, found by the (id, sl) pair
+        centers_keys = pd.MultiIndex.from_arrays([sl_centers.id.values, sl_centers.sl.values])
+        points_keys = pd.MultiIndex.from_arrays([trace_loc.id.values, trace_loc.sl.values])
+        positions = centers_keys.get_indexer(points_keys)
+
+        trace_loc = trace_loc.copy()
+        trace_loc['place_id'] = np.where(positions >= 0, place_ids[positions] if n else -1, -1)
+
+        places = sl_centers.groupby('place_id').agg(
+            x=('x', 'mean'),
+            y=('y', 'mean'),
+            n_nodes=('id', 'nunique'),
+            n_visits=('sl', 'size')
+        ).reset_index()
+
+        print(places)
+        print('Places found!')
+        return [trace_loc, sl_centers, places]
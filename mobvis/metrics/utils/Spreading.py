@@ -0,0 +1,439 @@
+import numpy as np
+import pandas as pd
+
+from mobvis.utils import Timer
+from mobvis.metrics.utils.ContactGraph import ContactGraph
+
+class Spreading:
+    """Contains the methods for time-respecting reachability and spreading processes over the contacts of a trace.
+
+       The contacts are turned into a stream of events sorted by time, read block by block (and part by part for
+       spilled contacts, so they are never loaded at once). A node reached at a timestamp only passes the
+       information on the next timestamps, so the result does not depend on the order of the contacts of a timestamp.
+
+       The earliest arrival times and the spreading models are computed on blocks of consecutive timestamps, in time order.
+       Each block is solved by relaxation rounds, a few array operations over its events (and all the Monte-Carlo
+       runs at once), so the cost does not grow with the number of distinct timestamps. On the SIR model, where a
+       node only infects during its infectious period, each round recomputes the infection times of the block.
+    """
+    # Number of (run, event) entries relaxed at a time
+    BLOCK_ENTRIES = 200000
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def event_blocks(cls, contacts, nodes, start_time, size):
+        """ Iterates over the contact events from `start_time` on, in time order, on blocks of about `size` events that
+        never split the events of a timestamp.
+
+        Contacts DataFrames and spilled contacts give one event per contact. Contact episodes give two events per
+        episode, on its start and end, so a node reached during an episode still passes the information at its end.
+        The parts of spilled contacts are in time order, so they are sorted and split one at a time, and only the
+        events of their last timestamp are held until the next part is loaded.
+
+        ### Returns:
+
+        `blocks` (tuple[]): Generator of (timestamps, rows of the first nodes, rows of the second nodes) tuples.
+        """
+        if isinstance(contacts, pd.DataFrame) and 'start' in contacts.columns:
+            parts = [(np.r_[contacts.id1.values, contacts.id1.values], np.r_[contacts.id2.values, contacts.id2.values], np.r_[contacts.start.values, contacts.end.values])]
+        elif isinstance(contacts, pd.DataFrame):
+            parts = [(contacts.id1.values, contacts.id2.values, contacts.timestamp.values)]
+        else:
+            parts = ((chunk.id1.values, chunk.id2.values, chunk.timestamp.values) for chunk in contacts.chunks(columns=['id1', 'id2', 'timestamp']))
+
+        held = [np.array([]), np.array([], dtype=np.int64), np.array([], dtype=np.int64)]
+
+        for id1, id2, timestamps in parts:
+            timestamps = timestamps.astype(np.float64)
+            kept = np.flatnonzero(timestamps >= start_time)
+            order = kept[np.argsort(timestamps[kept], kind='stable')]
+
+            timestamps = np.r_[held[0], timestamps[order]]
+            first = np.r_[held[1], ContactGraph.node_positions(nodes, id1[order])]
+            second = np.r_[held[2], ContactGraph.node_positions(nodes, id2[order])]
+
+            # The events of the last timestamp may continue on the next part
+            end = int(np.searchsorted(timestamps, timestamps[-1], side='left')) if len(timestamps) else 0
+
+            for block in cls.blocks(timestamps[:end], size):
+                yield timestamps[block], first[block], second[block]
+
+            held = [timestamps[end:], first[end:], second[end:]]
+
+        for block in cls.blocks(held[0], size):
+            yield held[0][block], held[1][block], held[2][block]
+
+    @classmethod
+    def events(cls, contacts, nodes, start_time=-np.inf):
+        """ Iterates over the contact events in time order, grouped by timestamp.
+
+        ### Returns:
+
+        `events` (tuple[]): Generator of (timestamp, rows of the first nodes, rows of the second nodes) tuples.
+        """
+        for timestamps, first, second in cls.event_blocks(contacts, nodes, start_time, cls.BLOCK_ENTRIES):
+            bounds = np.r_[0, np.flatnonzero(np.diff(timestamps)) + 1, len(timestamps)]
+
+            for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                yield timestamps[start], first[start:end], second[start:end]
+
+    def contact_nodes(contacts):
+        """ Returns the sorted identifiers of the nodes of the contacts.
+        """
+        if isinstance(contacts, pd.DataFrame):
+            return np.unique(np.r_[contacts.id1.values, contacts.id2.values])
+
+        found = [np.unique(np.r_[chunk.id1.values, chunk.id2.values]) for chunk in contacts.chunks(columns=['id1', 'id2'])]
+
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def relax(timestamps, first, second, arrival, is_seed, is_open=None):
+        """ Relaxes the arrival times of each run with the events of a block until they stop changing. Each round
+        takes a few array operations, and the number of rounds is the largest number of hops inside the block.
+
+        ### Parameters:
+
+        `is_open` (numpy.ndarray): If specified, flags of the events that can pass the information on each run, with shape (runs, events).
+        """
+        runs, n = arrival.shape
+        flat = arrival.reshape(-1)
+        offsets = (np.arange(runs) * n)[:, None]
+
+        # Only the events of nodes whose arrival changed on the last round can reach anyone earlier
+        active = np.arange(len(timestamps))
+
+        while len(active):
+            t = timestamps[active]
+            a = first[active]
+            b = second[active]
+
+            # Seeds pass the information from their arrival time on, the other nodes from the next timestamp on
+            ready_a = (arrival[:, a] < t) | (is_seed[:, a] & (arrival[:, a] <= t))
+            ready_b = (arrival[:, b] < t) | (is_seed[:, b] & (arrival[:, b] <= t))
+
+            to_b = ready_a & (arrival[:, b] > t)
+            to_a = ready_b & (arrival[:, a] > t)
+
+            if is_open is not None:
+                to_b &= is_open[:, active]
+                to_a &= is_open[:, active]
+
+            targets = np.r_[(offsets + b)[to_b], (offsets + a)[to_a]]
+            times = np.r_[np.broadcast_to(t, to_b.shape)[to_b], np.broadcast_to(t, to_a.shape)[to_a]]
+
+            if len(targets) == 0:
+                break
+
+            np.minimum.at(flat, targets, times)
+
+            changed = np.zeros(n, dtype=bool)
+            changed[np.unique(targets % n)] = True
+            active = np.flatnonzero(changed[first] | changed[second])
+
+    @classmethod
+    @Timer.timed
+    def earliest_arrival(cls, contacts, seeds, start_time=0, nodes=None):
+        """ Computes the earliest time each node can be reached from the seed nodes through time-respecting paths
+        of contacts, that is, paths whose contacts happen one after the other.
+
+        ### Parameters:
+
+        `contacts` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts extracted by `Contacts.detect_contacts`,
+            or contact episodes extracted by `Contacts.find_episodes`.
+        `seeds` (int[]): Identifiers of the nodes that hold the information at `start_time`.
+        `start_time` (float): Timestamp where the information starts to spread.
+        `nodes` (int[]): Node identifiers of the result. If `None`, the nodes of the contacts and the seeds are used.
+
+        ### Returns:
+
+        `arrivals` (pandas.DataFrame): DataFrame with one row per node, as shown below:
+            - id: Node identifier
+            - arrival_time: Earliest time the node is reached (NaN if it is never reached)
+            - hops: Smallest number of contacts of the time-respecting paths that reach the node on its arrival time (-1 if it is never reached)
+        """
+        print('Finding the earliest arrival times...')
+
+        if nodes is None:
+            nodes = np.unique(np.r_[cls.contact_nodes(contacts), np.asarray(seeds)])
+        else:
+            nodes = np.unique(np.asarray(nodes))
+
+        arrival = np.full(len(nodes), np.inf)
+        hops = np.full(len(nodes), np.inf)
+
+        seed_rows = ContactGraph.node_positions(nodes, np.asarray(seeds))
+        arrival[seed_rows] = start_time
+        hops[seed_rows] = 0
+
+        # Fewest hops of the paths that reach each node up to the current block, at any time
+        fewest = hops.copy()
+
+        for timestamps, first, second in cls.event_blocks(contacts, nodes, start_time, cls.BLOCK_ENTRIES):
+            cls.relax_hops(timestamps, first, second, arrival, hops, fewest)
+
+        arrivals = pd.DataFrame({
+            'id': nodes,
+            'arrival_time': np.where(np.isinf(arrival), np.nan, arrival),
+            'hops': np.where(np.isinf(hops), -1, hops).astype(np.int64)
+        })
+
+        print(f'Reached nodes: {int(np.isfinite(arrival).sum())} of {len(nodes)}')
+
+        return arrivals
+
+    def relax_hops(timestamps, first, second, arrival, hops, fewest):
+        """ Finds the arrival times and hops of the nodes reached on a block of events, updating `arrival`, `hops` and
+        `fewest` in place.
+
+        A node that is reached again later with fewer hops passes the information on with those hops, so the block is
+        relaxed one hop count at a time: on round `h`, `earliest` holds the earliest time each node is reached with at
+        most `h` hops, and a node passes the information with `h + 1` hops on the events after that time.
+        """
+        nodes, positions = np.unique(np.r_[first, second], return_inverse=True)
+        m = len(timestamps)
+
+        # Both directions of each event
+        senders = np.r_[positions[:m], positions[m:]]
+        receivers = np.r_[positions[m:], positions[:m]]
+        times = np.r_[timestamps, timestamps]
+
+        # Nodes reached before the block (and the seeds) pass the information on any event of the block
+        before = fewest[nodes]
+        levels = np.unique(before[np.isfinite(before)])
+
+        if len(levels) == 0:
+            return
+
+        level = levels[0]
+        earliest = np.where(before <= level, -np.inf, np.inf)
+        first_level = np.where(before <= level, before, np.inf)
+        last_level = np.full(len(nodes), np.inf)
+        active = np.arange(len(senders))
+
+        while True:
+            level += 1
+
+            updated = earliest.copy()
+            updated[before <= level] = -np.inf
+
+            ready = active[earliest[senders[active]] < times[active]]
+            np.minimum.at(updated, receivers[ready], times[ready])
+
+            changed = updated < earliest
+
+            if changed.any():
+                first_level[changed & np.isinf(first_level)] = level
+                last_level[changed] = level
+                earliest = updated
+                active = np.flatnonzero(changed[senders])
+                continue
+
+            # Nothing is reached with this many hops, so the next round starts on the next hops of the nodes reached before the block
+            pending = levels[levels > level]
+
+            if len(pending) == 0:
+                break
+
+            level = pending[0] - 1
+
+        np.minimum(fewest[nodes], first_level, out=first_level)
+        fewest[nodes] = first_level
+
+        # The last improvement of the earliest time of a node gives its arrival with the fewest hops
+        new = np.isinf(arrival[nodes]) & np.isfinite(earliest)
+        arrival[nodes[new]] = earliest[new]
+        hops[nodes[new]] = last_level[new]
+
+    def blocks(timestamps, size):
+        """ Splits the sorted events in blocks of about `size` events, on timestamp boundaries.
+
+        ### Returns:
+
+        `blocks` (slice[]): Generator of the slices of each block.
+        """
+        start = 0
+
+        while start < len(timestamps):
+            end = int(np.searchsorted(timestamps, timestamps[min(start + size, len(timestamps)) - 1], side='right'))
+            yield slice(start, end)
+            start = end
+
+    @classmethod
+    @Timer.timed
+    def simulate(cls, contacts, seeds, beta, model='SI', recovery_time=None, gamma=None, runs=100, start_time=0, nodes=None, random_state=None):
+        """ Simulates an SI or SIR spreading process over the contacts, with many Monte-Carlo runs at once.
+
+        On each contact between an infectious and a susceptible node, the susceptible node is infected with
+        probability `beta`. On the SIR model, each infected node recovers (and stops spreading) after a fixed
+        `recovery_time` or after an exponential time with rate `gamma`.
+
+        ### Parameters:
+
+        `contacts` (pandas.DataFrame | mobvis.utils.ContactStore.ContactStore): Contacts extracted by `Contacts.detect_contacts`,
+            or contact episodes extracted by `Contacts.find_episodes`.
+        `seeds` (int[] | int): Identifiers of the nodes infected at `start_time`, or a number of seeds drawn at random for each run.
+        `beta` (float): Infection probability of each contact.
+        `model` (str): Spreading model. Supported models are: SI and SIR.
+        `recovery_time` (float): Infectious period of the nodes on the SIR model, in seconds.
+        `gamma` (float): Recovery rate of the nodes on the SIR model (per second), used when `recovery_time` is not given.
+        `runs` (int): Number of Monte-Carlo runs.
+        `start_time` (float): Timestamp where the process starts.
+        `nodes` (int[]): Node identifiers of the simulation. If `None`, the nodes of the contacts (and seeds) are used.
+        `random_state` (int): Seed of the random number generator, for reproducible runs.
+
+        ### Returns:
+
+        `infections` (pandas.DataFrame): Infection time of each node (columns) on each run (rows). NaN if the node is never infected.
+        `recoveries` (pandas.DataFrame): Recovery time of each node on each run. NaN if the node is never infected or never recovers.
+        `prevalence` (pandas.DataFrame): Average state of the population over the runs, as shown below:
+            - timestamp: Timestamp of the contact events
+            - susceptible: Average number of susceptible nodes
+            - infected: Average number of infectious nodes
+            - recovered: Average number of recovered nodes
+        """
+        model = model.upper()
+
+        if model not in ('SI', 'SIR'):
+            raise ValueError(f'Unsupported spreading model: {model}. Supported models are: SI and SIR.')
+        if model == 'SIR' and recovery_time is None and gamma is None:
+            raise ValueError('The SIR model requires a recovery_time or a gamma.')
+
+        print(f'Simulating the {model} spreading...')
+        print(f'\nParameters:\nBeta: {beta}\nRuns: {runs}\n')
+
+        rng = np.random.default_rng(random_state)
+
+        if nodes is None:
+            nodes = cls.contact_nodes(contacts)
+            if not np.isscalar(seeds):
+                nodes = np.unique(np.r_[nodes, np.asarray(seeds)])
+        else:
+            nodes = np.unique(np.asarray(nodes))
+
+        n = len(nodes)
+        infection = np.full((runs, n), np.inf)
+        is_seed = np.zeros((runs, n), dtype=bool)
+
+        if np.isscalar(seeds):
+            # Random seeds: the first `seeds` nodes of a random permutation of each run
+            seed_rows = np.argsort(rng.random((runs, n)), axis=1)[:, :int(seeds)]
+            seed_runs = np.repeat(np.arange(runs), seed_rows.shape[1])
+            seed_rows = seed_rows.ravel()
+        else:
+            seed_rows = np.tile(ContactGraph.node_positions(nodes, np.asarray(seeds)), runs)
+            seed_runs = np.repeat(np.arange(runs), len(seeds))
+
+        infection[seed_runs, seed_rows] = start_time
+        is_seed[seed_runs, seed_rows] = True
+
+        if model == 'SIR':
+            # The infectious period of each node is drawn up front, since each node is infected at most once on a run
+            periods = np.full((runs, n), float(recovery_time)) if recovery_time is not None else rng.exponential(1 / gamma, (runs, n))
+        else:
+            periods = np.full((runs, n), np.inf)
+
+        event_times = []
+
+        for timestamps, first, second in cls.event_blocks(contacts, nodes, start_time, max(1, cls.BLOCK_ENTRIES // runs)):
+            event_times.append(np.unique(timestamps))
+
+            # Only one direction of an event can ever infect (one of the nodes must be susceptible), so one draw
+            # per event and run decides if it does
+            if model == 'SI':
+                cls.relax(timestamps, first, second, infection, is_seed, rng.random((runs, len(timestamps))) < beta)
+            else:
+                cls.relax_windows(timestamps, first, second, infection, periods, is_seed, rng.random((len(timestamps), runs)) < beta)
+
+        recovery = infection + periods
+
+        prevalence = cls.prevalence(infection, recovery, np.concatenate(event_times) if event_times else np.array([]))
+
+        infections = pd.DataFrame(np.where(np.isinf(infection), np.nan, infection), columns=nodes)
+        recoveries = pd.DataFrame(np.where(np.isinf(recovery), np.nan, recovery), columns=nodes)
+        infections.index.name = recoveries.index.name = 'run'
+
+        print(f'Average infected nodes: {np.isfinite(infection).sum(axis=1).mean()} of {n}')
+
+        return [infections, recoveries, prevalence]
+
+    def relax_windows(timestamps, first, second, infection, periods, is_seed, is_open):
+        """ Relaxes the infection times of each run with the events of a block on the SIR model, updating `infection` in place.
+
+        A node only infects during its infectious period, so an earlier infection of a node can stop it from infecting
+        on a later event, and the infection times can not be lowered one event at a time. Each round computes the
+        infection times of the block from scratch, from the times of the previous round. The infection of a node on
+        a timestamp only depends on the infections before it, so the rounds settle on the infections of the
+        sequential process, in about as many rounds as the longest chain of infections of the block.
+
+        ### Parameters:
+
+        `periods` (numpy.ndarray): Infectious period of each node on each run, with shape (runs, nodes).
+        `is_open` (numpy.ndarray): Flags of the events that infect on each run, with shape (events, runs).
+        """
+        nodes, positions = np.unique(np.r_[first, second], return_inverse=True)
+        m = len(timestamps)
+        a, b = positions[:m], positions[m:]
+
+        # Only the nodes of the block are relaxed, with one row per node so the rows of the events are gathered at once.
+        # The nodes infected before the block keep their infection times
+        before = infection[:, nodes].T.copy()
+
+        if np.isinf(before).all():
+            return
+
+        k, runs = before.shape
+        offsets = np.arange(runs)[None, :]
+        times = timestamps[:, None]
+        current = before
+
+        seeds_a, seeds_b = is_seed[:, nodes].T[a], is_seed[:, nodes].T[b]
+        periods_a, periods_b = periods[:, nodes].T[a], periods[:, nodes].T[b]
+
+        # The infections of each event, kept between the rounds. Only the events of the nodes changed on the last round are checked again
+        to_b = np.zeros((m, runs), dtype=bool)
+        to_a = np.zeros((m, runs), dtype=bool)
+        rows = np.arange(m)
+
+        while len(rows):
+            current_a, current_b = current[a[rows]], current[b[rows]]
+            t = times[rows]
+
+            # Nodes infected before the events of a timestamp (or seeded on it) and not recovered yet
+            infectious_a = ((current_a < t) | (seeds_a[rows] & (current_a <= t))) & (current_a + periods_a[rows] > t)
+            infectious_b = ((current_b < t) | (seeds_b[rows] & (current_b <= t))) & (current_b + periods_b[rows] > t)
+
+            checked_b = infectious_a & is_open[rows]
+            checked_a = infectious_b & is_open[rows]
+
+            if np.array_equal(checked_b, to_b[rows]) and np.array_equal(checked_a, to_a[rows]):
+                break
+
+            to_b[rows] = checked_b
+            to_a[rows] = checked_a
+
+            updated = before.copy()
+            np.minimum.at(updated.reshape(-1), np.r_[(b[:, None] * runs + offsets)[to_b], (a[:, None] * runs + offsets)[to_a]],
+                          np.r_[np.broadcast_to(times, to_b.shape)[to_b], np.broadcast_to(times, to_a.shape)[to_a]])
+
+            changed = (updated != current).any(axis=1)
+            rows = np.flatnonzero(changed[a] | changed[b])
+            current = updated
+
+        infection[:, nodes] = current.T
+
+    def prevalence(infection, recovery, timestamps):
+        """ Averages the number of susceptible, infected and recovered nodes over the runs, at each timestamp.
+        """
+        runs, n = infection.shape
+
+        infected = np.searchsorted(np.sort(infection.ravel()), timestamps, side='right') / runs
+        recovered = np.searchsorted(np.sort(recovery.ravel()), timestamps, side='right') / runs
+
+        return pd.DataFrame({
+            'timestamp': timestamps,
+            'susceptible': n - infected,
+            'infected': infected - recovered,
+            'recovered': recovered
+        })
@@ -1,8 +1,18 @@
+import os
+import shutil
+import tempfile
+
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
 
 from mobvis.utils import Timer
 from mobvis.utils import Converters
+from mobvis.utils import TraceStore
+from mobvis.utils.BinaryTrace import BinaryTrace
 
+from multiprocessing import Pool
 from multiprocessing.pool import ThreadPool
 
 import mobvis.utils.constants as constants
@@ -14,43 +24,85 @@ class Parser:
         pass
 
     @classmethod
-    def multiparse(cls, raw_traces, ordered_flags):
+    def multiparse(cls, raw_traces, ordered_flags, use_processes=False, processes=None, out_dir=None, as_binary=False):
         """ Method that converts multiple DataFrames to the MobVis standard format
-            concurrently, using threads.
+            concurrently, using threads or processes.
+
+            In the process mode, each worker parses one trace and writes it to the memory-mapped
+            binary format (mobvis.utils.BinaryTrace), so only file paths are sent between the
+            processes instead of pickled DataFrames.
 
         ### Parameters:
 
-        `raw_traces` (pandas.DataFrame[]): Raw DataFrames list containing the original traces
+        `raw_traces` (pandas.DataFrame[] | str[]): Raw DataFrames list containing the original traces. On the process mode, paths of .csv/.txt files
+            can be given instead, so each worker reads its own file.
         `ordered_flags` (bool[]): 'True' if the rows of the raw DataFrame are ordered by the id and timestamps, `False` otherwise, following the raw_traces list order.
+        `use_processes` (bool): If 'True', the traces are parsed by a pool of processes instead of threads.
+        `processes` (int): Number of workers of the pool. If `None`, the number of CPUs is used.
+        `out_dir` (str): Directory where the workers write the parsed traces on the process mode. If `None`, a temporary directory is created
+            (and removed once the DataFrames are loaded, unless `as_binary` is 'True').
+        `as_binary` (bool): If 'True', the process mode returns the memory-mapped BinaryTrace objects instead of DataFrames.
 
         ### Returns:
 
-        `std_traces` (pandas.DataFrame[]): DataFrames list corresponding to the parsed traces.
+        `std_traces` (pandas.DataFrame[]): DataFrames list corresponding to the parsed traces, following the raw_traces list order.
         """
         print('Multiparsing:\n')
 
         if len(ordered_flags) == 0:
             ordered_flags = [True for _ in range(0, len(raw_traces))]
 
-        args = [(raw_traces[i], ordered_flags[i]) for i in range(0, len(raw_traces))]
+        if not use_processes:
+            args = [(raw_traces[i], ordered_flags[i]) for i in range(0, len(raw_traces))]
 
-        std_traces = []
+            std_traces = []
+
+            with ThreadPool(processes) as pool:
+                for result in pool.starmap(cls.parse, args):
+                    std_traces.append(result)
+
+            return std_traces
+
+        is_temporary = out_dir is None
+
+        if is_temporary:
+            out_dir = tempfile.mkdtemp(prefix='mobvis_')
+
+        args = [(raw_traces[i], ordered_flags[i], os.path.join(out_dir, f'trace_{i}.npy')) for i in range(0, len(raw_traces))]
+
+        with Pool(processes) as pool:
+            paths = pool.starmap(parse_worker, args)
+
+        binary_traces = [BinaryTrace.open(path) for path in paths]
+
+        if as_binary:
+            return binary_traces
+
+        if not is_temporary:
+            return [binary_trace.to_dataframe() for binary_trace in binary_traces]
+
+        # The DataFrames are copied out of the memory-mapped files before the temporary directory is removed
+        std_traces = [binary_trace.to_dataframe().copy() for binary_trace in binary_traces]
+
+        del binary_traces
+        shutil.rmtree(out_dir, ignore_errors=True)
 
-        with ThreadPool() as pool:
-            for result in pool.starmap(cls.parse, args):
-                std_traces.append(result)
-        
         return std_traces
 
     @classmethod
     @Timer.timed
-    def parse(cls, raw_trace, is_ordered=True):
+    def parse(cls, raw_trace, is_ordered=True, origin=None, store_path=None, compact=False, datetime_format=None, timestamp_unit=None):
         """ Method that converts a given DataFrame to the MobVis standard format.
 
         ### Parameters:
 
         `raw_trace` (pandas.DataFrame): Raw DataFrame containing the original trace.
         `is_ordered` (bool): 'True' if the rows of the raw DataFrame are ordered by the id and timestamps, `False` otherwise.
+        `origin` (float | str): Timestamp (or datetime) used as the time zero of the parsed trace. If `None`, the smallest timestamp of the trace is used.
+        `store_path` (str): If specified, the parsed trace is also saved on this .parquet or .feather path, so it can be reloaded with `Parser.load`.
+        `compact` (bool): If 'True', the parsed trace follows the compact schema (int32 ids and float32 coordinates), which is kept by the locations, contacts and metrics extracted from it.
+        `datetime_format` (str): Explicit format of datetime string timestamps. If `None`, the format is inferred from the first valid timestamp.
+        `timestamp_unit` (str): Epoch unit (s, ms, us or ns) of numeric timestamps. If `None`, numeric timestamps are used as they are.
 
         ### Returns:
 
@@ -58,18 +110,176 @@ class Parser:
         """
         print('Parsing the given DataFrame...')
 
-        std_trace = cls.check_columns(raw_trace)
-        std_trace = cls.fix_timestamps(std_trace)
+        std_trace = cls.check_columns(raw_trace, datetime_format, timestamp_unit)
+        std_trace = cls.fix_timestamps(std_trace, origin=origin, compact=compact)
 
         if not is_ordered:
             std_trace = cls.order_rows(std_trace)
 
+        if store_path is not None:
+            TraceStore.write_trace(std_trace, store_path)
+
         print('Successfully parsed!\n')
         print(std_trace)
 
         return std_trace
 
-    def check_columns(raw_trace):
+    @classmethod
+    @Timer.timed
+    def load(cls, store_path, ids=None, time_window=None, bbox=None):
+        """ Method that loads a trace previously parsed and saved with the `store_path` parameter of `Parser.parse`.
+
+        ### Parameters:
+
+        `store_path` (str): Path of the stored trace (.parquet or .feather).
+        `ids` (int[]): If specified, only the rows of these nodes are loaded.
+        `time_window` (float[]): Minimum and maximum timestamps (inclusive) of the loaded rows.
+        `bbox` (float[]): Bounding box of the loaded rows, as [min_x, min_y, max_x, max_y].
+
+        ### Returns:
+
+        `std_trace` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+        """
+        print('Loading the stored trace...')
+
+        std_trace = TraceStore.read_trace(store_path, ids=ids, time_window=time_window, bbox=bbox)
+
+        print('Successfully loaded!\n')
+
+        return std_trace
+
+    @classmethod
+    def parse_stream(cls, source, chunksize=100000, origin=None, is_ordered=True, compact=False, datetime_format=None, timestamp_unit=None, **read_kwargs):
+        """ Generator that converts a trace to the MobVis standard format chunk by chunk, so traces
+            larger than the available memory can be parsed with bounded memory.
+
+        ### Parameters:
+
+        `source` (str | pandas.DataFrame[]): Path of a .csv/.txt file, or an iterable of raw DataFrames.
+        `chunksize` (int): Number of raw rows read at once when `source` is a path.
+        `origin` (float | str): Timestamp (or datetime) used as the time zero of the trace. If `None`, it is found by a first pass that reads only the timestamp column.
+        `is_ordered` (bool): 'True' if the raw rows are ordered by the id and timestamps. In this case the rows of a node are never split between two chunks,
+            otherwise each chunk is sorted on its own and a node may appear in more than one chunk.
+        `compact` (bool): If 'True', the chunks follow the compact schema (int32 ids and float32 coordinates).
+        `datetime_format` (str): Explicit format of datetime string timestamps. If `None`, the format is inferred on the first chunk and kept for the
+            next chunks of this trace.
+        `timestamp_unit` (str): Epoch unit (s, ms, us or ns) of numeric timestamps.
+        `**read_kwargs`: Extra arguments passed to pandas.read_csv.
+
+        ### Yields:
+
+        `std_chunk` (pandas.DataFrame): Parsed chunk, ordered by the id and timestamps.
+        """
+        print('Parsing the given trace in chunks...')
+
+        # Datetime formats inferred on this trace, so they never leak to the traces parsed later
+        formats = {}
+
+        if origin is None:
+            origin = cls.find_origin(source, chunksize, datetime_format, timestamp_unit, formats, **read_kwargs)
+
+        pending = None
+
+        for raw_chunk in cls.read_chunks(source, chunksize, **read_kwargs):
+            std_chunk = cls.check_columns(raw_chunk.reset_index(drop=True), datetime_format, timestamp_unit, formats)
+            std_chunk = cls.fix_timestamps(std_chunk, origin=origin, compact=compact)
+
+            if not is_ordered:
+                yield std_chunk.sort_values(by=['id', 'timestamp'], kind='stable', ignore_index=True)
+                continue
+
+            if pending is not None:
+                std_chunk = pd.concat([pending, std_chunk], ignore_index=True)
+
+            # The last node of the chunk may continue on the next one, so its rows are held back
+            ids = std_chunk['id'].values
+            last_node_start = np.flatnonzero(ids != ids[-1])
+            last_node_start = last_node_start[-1] + 1 if last_node_start.size else 0
+
+            pending = std_chunk.iloc[last_node_start:]
+
+            if last_node_start > 0:
+                yield std_chunk.iloc[:last_node_start]
+
+        if pending is not None and len(pending) > 0:
+            yield pending.reset_index(drop=True)
+
+        print('Successfully parsed!\n')
+
+    @classmethod
+    def find_origin(cls, source, chunksize=100000, datetime_format=None, timestamp_unit=None, formats=None, **read_kwargs):
+        """ Finds the smallest timestamp of a trace with a cheap pass that reads only its timestamp column.
+
+        ### Parameters:
+
+        `source` (str | pandas.DataFrame[]): Path of a .csv/.txt file, or a list of raw DataFrames.
+        `chunksize` (int): Number of rows read at once when `source` is a path.
+        `datetime_format` (str): Explicit format of datetime string timestamps.
+        `timestamp_unit` (str): Epoch unit (s, ms, us or ns) of numeric timestamps.
+        `formats` (dict): Datetime formats inferred on the trace, by column name. If `None`, they are only shared by the chunks of this pass.
+        `**read_kwargs`: Extra arguments passed to pandas.read_csv.
+
+        ### Returns:
+
+        `origin` (float): Smallest timestamp of the trace, in seconds.
+        """
+        is_path = isinstance(source, (str, os.PathLike))
+
+        if not is_path and iter(source) is source:
+            raise ValueError('The origin must be provided when the trace is read from a one-shot iterator.')
+
+        if is_path:
+            header = next(cls.read_chunks(source, 1, nrows=0, **read_kwargs)).columns
+            read_kwargs['usecols'] = [cls.timestamp_column(header)]
+
+        if formats is None:
+            formats = {}
+
+        origin = None
+
+        for chunk in cls.read_chunks(source, chunksize, **read_kwargs):
+            timestamp_column = cls.timestamp_column(chunk.columns)
+            timestamps = chunk[[timestamp_column]]
+
+            if timestamp_unit is not None or Converters.is_datetime_column(timestamps[timestamp_column]):
+                timestamps = Converters.convert_datetime(timestamps, timestamp_column, format=datetime_format, unit=timestamp_unit, formats=formats)
+
+            chunk_min = timestamps[timestamp_column].astype(float).min()
+            origin = chunk_min if origin is None else min(origin, chunk_min)
+
+        print(f'Shorter timestamp: {origin}')
+
+        return origin
+
+    def read_chunks(source, chunksize, **read_kwargs):
+        """ Iterates over the raw chunks of a trace file, or over an iterable of raw DataFrames.
+            If `chunksize` is `None`, the whole file is read as a single chunk.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            if str(source).split('.')[-1] == 'txt':
+                read_kwargs.setdefault('sep', ' ')
+
+            if chunksize is None or read_kwargs.get('nrows') == 0:
+                yield pd.read_csv(source, **read_kwargs)
+                return
+
+            with pd.read_csv(source, chunksize=chunksize, **read_kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+        else:
+            for chunk in source:
+                yield chunk
+
+    def timestamp_column(columns):
+        """ Returns the name of the timestamp column of a raw trace.
+        """
+        for column in columns:
+            if isinstance(column, str) and column.lower() in constants.SUPPORTED_TIMESTAMPS + ['timestamp']:
+                return column
+
+        raise KeyError('The provided trace does not contain a timestamp column. Supported names are: ' + ', '.join(constants.SUPPORTED_TIMESTAMPS))
+
+    def check_columns(raw_trace, datetime_format=None, timestamp_unit=None, formats=None):
         """ Detects the columns of the raw trace and performs the procedures to convert
             them (if needed) to the standard MobVis format.
         """
@@ -99,9 +309,9 @@ class Parser:
         raw_timestamp = [item for item in raw_trace.columns if item.lower() in constants.SUPPORTED_TIMESTAMPS]
         if raw_timestamp:
             raw_timestamp = raw_timestamp[0]
-            if type(raw_trace[raw_timestamp][0]) == str:
-                # Check if the timestamp column are a datetime string, then convert it to the timestamps in seconds format
-                raw_trace = Converters.convert_datetime(raw_trace, raw_timestamp)
+            if timestamp_unit is not None or Converters.is_datetime_column(raw_trace[raw_timestamp]):
+                # Check if the timestamp column are a datetime string (or an epoch on another unit), then convert it to the timestamps in seconds format
+                raw_trace = Converters.convert_datetime(raw_trace, raw_timestamp, format=datetime_format, unit=timestamp_unit, formats=formats)
             raw_trace.rename(columns={raw_timestamp: 'timestamp'}, inplace=True)
 
         # Check if the coordinates column in the raw trace are on the lat/long format, and consider some
@@ -133,43 +343,61 @@ class Parser:
         return std_trace
 
     @classmethod
-    def fix_timestamps(cls, std_trace):
+    def fix_timestamps(cls, std_trace, origin=None, compact=False):
         """ Takes the smallest timestamp from the original trace and uses it as the zero timestamp.
             From there, it defines the other timestamps of the trace from the difference of the original
             timestamps and the smallest timestamp.
+
+            The offset, the dtype casts and the column reordering are done as whole-column operations,
+            so no row of the trace is visited by Python code.
+
+        ### Parameters:
+
+        `std_trace` (pandas.DataFrame): Trace with the four standard columns.
+        `origin` (float | str): Timestamp used as the zero time, in seconds or as a datetime. If `None`, the smallest timestamp of the trace is used.
+            Passing the same origin to several traces makes them share the same time zero.
+        `compact` (bool): If 'True', the columns are casted to the compact schema (int32 ids and float32 coordinates) instead of the standard one.
+
+        ### Returns:
+
+        `std_trace` (pandas.DataFrame): Trace with the normalized timestamps, ordered as id, timestamp, x, y.
         """
         print('Fixing the timestamps...')
 
-        try:
-            std_trace['timestamp'] = std_trace['timestamp'].astype(float)
-            std_trace['id'] = std_trace['id'].astype(int)
-            std_trace['x'] = std_trace['x'].astype(float)
-            std_trace['y'] = std_trace['y'].astype(float)
-        except KeyError:
+        if not all(column in std_trace.columns for column in ['id', 'timestamp', 'x', 'y']):
             raise KeyError('The provided trace does not contain the four required columns: Timestamp, Identifier and Coordinates')
 
-        fixed_timestamps = []
+        std_trace = Converters.apply_schema(std_trace, constants.COMPACT_SCHEMA if compact else constants.STANDARD_SCHEMA)
 
-        first_timestamp = std_trace['timestamp'].min()
-        for i in std_trace.id.unique():
-            current_timestamp = std_trace.loc[std_trace.id == i].timestamp.values[0]
-            if current_timestamp < first_timestamp:
-                first_timestamp = current_timestamp
+        if origin is None:
+            first_timestamp = std_trace['timestamp'].min()
+        elif isinstance(origin, (str, datetime)):
+            first_timestamp = Converters.to_seconds(pd.Timestamp(origin))
+        else:
+            first_timestamp = float(origin)
         print(f'Shorter timestamp: {first_timestamp}')
-        
-        for row in std_trace.iterrows():
-            fixed_timestamps.append(row[1].timestamp - first_timestamp)
-            
-        std_trace.drop('timestamp', axis=1, inplace=True)
-        std_trace['timestamp'] = fixed_timestamps
 
-        cols = std_trace.columns.tolist()
-
-        cols.insert(1, cols[-1])
-        cols.pop(-1)
+        std_trace['timestamp'] = std_trace['timestamp'].values - first_timestamp
 
+        cols = ['id', 'timestamp'] + [col for col in std_trace.columns if col not in ('id', 'timestamp')]
         std_trace = std_trace[cols]
-            
+
         print('Timestamps fixed!\n')
 
         return std_trace
+
+def parse_worker(raw_trace, is_ordered, path):
+    """ Parses a single trace on a worker process and saves it on the binary format.
+
+    ### Returns:
+
+    `path` (str): Path of the saved trace.
+    """
+    if isinstance(raw_trace, (str, os.PathLike)):
+        raw_trace = next(Parser.read_chunks(raw_trace, None))
+
+    std_trace = Parser.parse(raw_trace, is_ordered)
+
+    BinaryTrace.write(std_trace, path)
+
+    return path
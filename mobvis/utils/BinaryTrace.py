@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+class BinaryTrace:
+    """Parsed trace stored on a compact binary format that is opened with `numpy.memmap`.
+
+       The trace is saved as a fixed-width structured NumPy array (int32 id, float64 timestamp and
+       float32 or float64 coordinates) sorted by the id and timestamps, together with a small sidecar
+       index holding the start and end offsets of each node. Opening a trace only maps the file, the
+       per-node slices are zero-copy views of it, and processes that open the same file share the
+       OS page cache instead of holding their own copy of the trace.
+    """
+    def __init__(self, path):
+        """ Opens a trace saved with `BinaryTrace.write`.
+
+        ### Parameters:
+
+        `path` (str): Path of the trace file (.npy).
+        """
+        self.path = str(path)
+
+        self.records = np.load(self.path, mmap_mode='r')
+        self.index = np.load(self.index_path(self.path))
+
+        self.offsets = dict(zip(self.index['id'].tolist(), range(len(self.index))))
+
+    @staticmethod
+    def index_path(path):
+        """ Returns the path of the sidecar index of a trace file.
+        """
+        path = str(path)
+
+        return (path[:-4] if path.endswith('.npy') else path) + '.idx.npy'
+
+    @classmethod
+    def write(cls, trace, path, coord_dtype='float64'):
+        """ Saves a parsed trace on the binary format.
+
+        ### Parameters:
+
+        `trace` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+        `path` (str): Path (with filename and .npy extention) where the trace should be saved.
+        `coord_dtype` (str): Type of the x and y coordinates. Supported types are float32 (projected data) and float64.
+
+        ### Returns:
+
+        `binary_trace` (BinaryTrace): The saved trace, opened as a memory-mapped file.
+        """
+        if np.dtype(coord_dtype) not in (np.dtype('float32'), np.dtype('float64')):
+            raise ValueError('Supported coordinate types are: float32 and float64')
+
+        ids = trace['id'].values
+
+        if len(ids) and (ids.min() < np.iinfo(np.int32).min or ids.max() > np.iinfo(np.int32).max):
+            raise ValueError('The node identifiers of the trace do not fit on the int32 type of the binary format.')
+
+        timestamps = trace['timestamp'].values.astype(np.float64)
+        order = np.lexsort((timestamps, ids))
+
+        dtype = np.dtype([('id', '<i4'), ('timestamp', '<f8'), ('x', coord_dtype), ('y', coord_dtype)])
+
+        records = np.lib.format.open_memmap(str(path), mode='w+', dtype=dtype, shape=(len(trace),))
+        records['id'] = ids[order]
+        records['timestamp'] = timestamps[order]
+        records['x'] = trace['x'].values[order]
+        records['y'] = trace['y'].values[order]
+        records.flush()
+
+        sorted_ids = records['id']
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(sorted_ids) else np.array([], dtype=np.int64)
+
+        index = np.empty(len(starts), dtype=[('id', '<i4'), ('start', '<i8'), ('end', '<i8')])
+        index['id'] = sorted_ids[starts]
+        index['start'] = starts
+        index['end'] = np.r_[starts[1:], len(sorted_ids)]
+
+        np.save(cls.index_path(path), index)
+
+        del records
+
+        return cls(path)
+
+    @classmethod
+    def open(cls, path):
+        """ Opens a trace saved with `BinaryTrace.write`.
+        """
+        return cls(path)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getstate__(self):
+        # Only the path is sent to other processes, which map the same file again
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    @property
+    def ids(self):
+        """ Identifiers of the nodes of the trace, in ascending order.
+        """
+        return self.index['id']
+
+    def node(self, node_id):
+        """ Returns the records of a node as a zero-copy view of the mapped file.
+
+        ### Parameters:
+
+        `node_id` (int): Node identifier.
+
+        ### Returns:
+
+        `records` (numpy.ndarray): Structured array with the id, timestamp, x and y fields of the node.
+        """
+        try:
+            position = self.offsets[int(node_id)]
+        except KeyError:
+            raise KeyError(f'Node {node_id} is not on the trace.')
+
+        return self.records[self.index['start'][position]:self.index['end'][position]]
+
+    def to_dataframe(self, ids=None):
+        """ Converts the trace (or only some of its nodes) to the MobVis standard DataFrame.
+
+        ### Parameters:
+
+        `ids` (int[]): If specified, only the rows of these nodes are converted.
+
+        ### Returns:
+
+        `std_trace` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+        """
+        if ids is None:
+            records = self.records
+        else:
+            records = np.concatenate([self.node(i) for i in ids]) if len(ids) else self.records[:0]
+
+        return pd.DataFrame({
+            'id': records['id'].astype(np.int64),
+            'timestamp': records['timestamp'],
+            'x': records['x'],
+            'y': records['y']
+        })
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from mobvis.utils import TraceStore
+
+class ResultCache:
+    """Persistent on-disk cache for the results of `Locations.find_locations`, `HomeLocations.find_homes`
+       and `Contacts.detect_contacts`, so repeated runs on the same data return instantly.
+
+       Each entry is keyed by a fingerprint of the input DataFrame (a hash of its columns and index) and the
+       parameters of the call, and its DataFrames are stored on the Parquet format. When the cache
+       grows over `max_bytes`, the least recently used entries are evicted.
+    """
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        """ Opens (or creates) a cache.
+
+        ### Parameters:
+
+        `directory` (str): Directory where the cache entries are stored.
+        `max_bytes` (int): Maximum size of the cache on disk, in bytes.
+        """
+        TraceStore.import_pyarrow()
+
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(df):
+        """ Computes a fast fingerprint of a DataFrame from the hashes of its rows and index, column names and types.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+
+        digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()] + [str(df.index.dtype)]).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+        return digest.hexdigest()
+
+    def key(self, name, df, **params):
+        """ Builds the key of an entry from the function name, the input DataFrame and the call parameters.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+
+        digest.update(name.encode())
+        digest.update(self.fingerprint(df).encode())
+        digest.update(repr(sorted(params.items())).encode())
+
+        return digest.hexdigest()
+
+    def get_or_compute(self, name, df, params, compute):
+        """ Returns the cached result of a call, or computes and stores it.
+
+        ### Parameters:
+
+        `name` (str): Name of the cached function.
+        `df` (pandas.DataFrame): Input DataFrame of the call.
+        `params` (dict): Parameters of the call.
+        `compute` (function): Function without arguments that computes the result (a DataFrame or a list of DataFrames).
+
+        ### Returns:
+
+        `result` (pandas.DataFrame | pandas.DataFrame[]): The cached or computed result.
+        """
+        key = self.key(name, df, **params)
+
+        result = self.load(key)
+
+        if result is not None:
+            self.hits += 1
+            print(f'Cache hit: {name}')
+            return result
+
+        self.misses += 1
+
+        return self.store(key, compute())
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """ Loads an entry, returning `None` if it is not on the cache.
+        """
+        pa, pq, feather = TraceStore.import_pyarrow()
+        path = self.entry_path(key)
+        meta_path = os.path.join(path, 'meta.json')
+
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+
+        frames = [pq.read_table(os.path.join(path, f'part_{i}.parquet')).to_pandas() for i in range(meta['parts'])]
+
+        # The access time of the entry is kept on its metadata file, for the LRU eviction
+        os.utime(meta_path)
+
+        return frames if meta['is_list'] else frames[0]
+
+    def store(self, key, result):
+        """ Stores an entry and evicts the least recently used entries if the cache is full. Object columns
+            are stored with their inferred types, and the stored result is returned so a cache miss gives
+            the same DataFrames as the next hits.
+        """
+        pa, pq, feather = TraceStore.import_pyarrow()
+        path = self.entry_path(key)
+
+        is_list = isinstance(result, (list, tuple))
+        frames = [frame.infer_objects() for frame in (result if is_list else [result])]
+
+        os.makedirs(path, exist_ok=True)
+
+        for i, frame in enumerate(frames):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            pq.write_table(table, os.path.join(path, f'part_{i}.parquet'))
+
+        # The metadata file is written last, so entries interrupted while being written are never loaded
+        with open(os.path.join(path, 'meta.json'), 'w') as meta_file:
+            json.dump({'parts': len(frames), 'is_list': is_list}, meta_file)
+
+        self.evict()
+
+        return frames if is_list else frames[0]
+
+    def entries(self):
+        """ Lists the cache entries as (key, size in bytes, last access time) tuples, from the least to the most recently used.
+        """
+        entries = []
+
+        for key in os.listdir(self.directory):
+            path = self.entry_path(key)
+            meta_path = os.path.join(path, 'meta.json')
+
+            if not os.path.exists(meta_path):
+                continue
+
+            size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+            entries.append((key, size, os.path.getmtime(meta_path)))
+
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache size is under `max_bytes`.
+        """
+        entries = self.entries()
+        total = sum(entry[1] for entry in entries)
+
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def invalidate(self, name, df, **params):
+        """ Removes the entry of a specific call from the cache.
+
+        ### Returns:
+
+        `removed` (bool): 'True' if the entry was on the cache.
+        """
+        path = self.entry_path(self.key(name, df, **params))
+
+        if not os.path.exists(path):
+            return False
+
+        shutil.rmtree(path, ignore_errors=True)
+
+        return True
+
+    def clear(self):
+        """ Removes all the entries of the cache.
+        """
+        for key in os.listdir(self.directory):
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def stats(self):
+        """ Returns the hit/miss statistics of this cache object and the current state of the cache on disk.
+
+        ### Returns:
+
+        `stats` (dict): Dictionary with the hits, misses, hit_ratio, evictions, entries and size_bytes keys.
+        """
+        entries = self.entries()
+        calls = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / calls if calls else 0.0,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'size_bytes': sum(entry[1] for entry in entries)
+        }
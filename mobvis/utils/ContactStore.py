@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+class ContactStore:
+    """Contacts of a trace spilled to disk by `Contacts.detect_contacts`, so their number is not bounded
+       by the memory.
+
+       The contacts are stored on a directory as a sequence of .npy parts (structured arrays with the
+       columns of the contacts DataFrame), one per time chunk of the trace, in time order: every contact is
+       written to the part that owns the time bin of its timestamp, so the timestamps of a part never go
+       before the ones of the previous part. The parts are opened with `numpy.memmap` and read one at a
+       time, so the social metrics can stream over them.
+    """
+    COLUMNS = ['id1', 'id2', 'x1', 'y1', 'x2', 'y2', 'timestamp']
+
+    def __init__(self, directory):
+        """ Opens the contacts stored on a directory.
+
+        ### Parameters:
+
+        `directory` (str): Directory where the parts were written.
+        """
+        self.directory = str(directory)
+
+        parts = sorted(file for file in os.listdir(self.directory) if file.startswith('part_') and file.endswith('.npy'))
+
+        self.paths = [os.path.join(self.directory, file) for file in parts]
+
+    @staticmethod
+    def part_path(directory, number):
+        """ Returns the path of a part of the store, named so the parts are listed in time order.
+        """
+        return os.path.join(str(directory), f'part_{number:06d}.npy')
+
+    @staticmethod
+    def write_part(contacts, path):
+        """ Saves a chunk of contacts as a part of the store.
+
+        ### Parameters:
+
+        `contacts` (pandas.DataFrame): Contacts of the chunk, with the columns of `ContactStore.COLUMNS`.
+        `path` (str): Path of the part, given by `ContactStore.part_path`.
+
+        ### Returns:
+
+        `count` (int): Number of contacts of the part.
+        """
+        np.save(path, contacts[ContactStore.COLUMNS].to_records(index=False))
+
+        return len(contacts)
+
+    def __len__(self):
+        return sum(len(self.part(i)) for i in range(len(self.paths)))
+
+    def __getstate__(self):
+        # Only the directory is sent to other processes, which open the same parts again
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def part(self, number):
+        """ Returns a part of the store as a memory-mapped structured array.
+        """
+        return np.load(self.paths[number], mmap_mode='r')
+
+    def chunks(self, columns=None):
+        """ Iterates over the parts of the store, in time order, loading one at a time.
+
+        ### Parameters:
+
+        `columns` (str[]): If specified, only these columns are loaded.
+
+        ### Returns:
+
+        `chunks` (pandas.DataFrame[]): Generator of the contacts DataFrame of each part.
+        """
+        columns = self.COLUMNS if columns is None else columns
+
+        for i in range(len(self.paths)):
+            records = self.part(i)
+
+            yield pd.DataFrame({column: np.array(records[column]) for column in columns})
+
+    def to_dataframe(self):
+        """ Loads all the contacts of the store in a single DataFrame.
+        """
+        chunks = list(self.chunks())
+
+        if not chunks:
+            return pd.DataFrame(columns=self.COLUMNS)
+
+        return pd.concat(chunks, ignore_index=True)
@@ -1,31 +1,175 @@
+import numpy as np
 import pandas as pd
 
-def convert_datetime(trace, date_column):
-    """ Converts any datetime format to timestamps in seconds. The first datetime
-        will be considered as the 0 time.
+import mobvis.utils.constants as constants
+
+# Seconds on each epoch unit supported by `convert_datetime`.
+EPOCH_UNITS = {
+    's': 1.0,
+    'ms': 1e-3,
+    'us': 1e-6,
+    'ns': 1e-9
+}
+
+def guess_format(sample):
+    """ Infers the format of a datetime string, returning `None` if it cannot be inferred.
+    """
+    try:
+        from pandas.tseries.api import guess_datetime_format
+    except ImportError:
+        from pandas._libs.tslibs.parsing import guess_datetime_format
+
+    try:
+        return guess_datetime_format(sample)
+    except (TypeError, ValueError):
+        return None
+
+def is_datetime_column(column):
+    """ Checks if a timestamp column holds datetimes (or datetime strings) instead of numbers.
+        The first valid value is used, so the check does not depend on the index of the column.
+    """
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return True
+    if pd.api.types.is_numeric_dtype(column):
+        return False
+
+    first_valid = column.first_valid_index()
+
+    return first_valid is not None and isinstance(column.loc[first_valid], str)
+
+def to_seconds(datetimes):
+    """ Converts datetimes to seconds since the Unix epoch, on a single array operation. Timezone-aware
+        datetimes are converted to UTC, and naive datetimes are considered to already be on UTC.
+    """
+    if isinstance(datetimes, pd.Series):
+        tz = datetimes.dt.tz
+    else:
+        tz = getattr(datetimes, 'tz', None)
+
+    epoch = pd.Timestamp(0, tz='UTC') if tz is not None else pd.Timestamp(0)
+
+    return (datetimes - epoch) / pd.Timedelta(seconds=1)
+
+def convert_datetime(trace, date_column, format=None, unit=None, formats=None):
+    """ Converts any datetime format to timestamps in seconds since the Unix epoch. Since the
+        conversion does not depend on the other rows of the trace, chunks of the same trace
+        converted separately share the same time reference.
 
     ### Parameters:
 
     `trace` (pandas.DataFrame): DataFrame of the trace.
     `date_column` (str): Name of the date column on the DataFrame.
+    `format` (str): Explicit strftime format of the datetime strings. If `None`, the format is inferred
+        from the first valid value.
+    `unit` (str): If specified, the column holds numeric epoch timestamps on this unit (s, ms, us or ns)
+        instead of datetime strings.
+    `formats` (dict): Inferred formats by column name, shared by the calls on the chunks of the same trace so
+        the format is only inferred on the first one. If `None`, the format is inferred on every call.
 
     ### Returns:
 
     `trace` (pandas.DataFrame): DataFrame with the datetimes converted to seconds.
     """
+    column = trace[date_column]
+
+    if unit is not None:
+        if unit not in EPOCH_UNITS:
+            raise ValueError(f'Unsupported epoch unit: {unit}. Supported units are: ' + ', '.join(EPOCH_UNITS))
+
+        seconds = column.astype(float) * EPOCH_UNITS[unit]
+    elif pd.api.types.is_datetime64_any_dtype(column):
+        seconds = to_seconds(column)
+    else:
+        seconds = to_seconds(parse_datetimes(column, date_column, format, formats))
 
-    trace[date_column] = pd.to_datetime(trace[date_column])
-    first_timestamp = trace[date_column].min()
-    
-    new_timestamps = []
-    
-    for i, row in trace.iterrows():
-        current_timestamp = row[date_column]
-        difference = (current_timestamp - first_timestamp).total_seconds()
-        
-        new_timestamps.append(difference)
-        
     trace = trace.drop(date_column, axis=1)
-    trace[date_column] = new_timestamps
-    
+    trace[date_column] = seconds.values
+
     return trace
+
+def parse_datetimes(column, date_column, format=None, formats=None):
+    """ Parses a column of datetime strings with an explicit, cached or inferred format. The inferred
+        format is cached on `formats`, which only lives as long as the parsing of one trace.
+    """
+    if format is not None:
+        return pd.to_datetime(column, format=format, utc=True)
+
+    if formats is None:
+        formats = {}
+
+    if date_column in formats:
+        try:
+            return pd.to_datetime(column, format=formats[date_column], utc=True)
+        except ValueError:
+            # The cached format does not match this column anymore, so it is inferred again
+            formats.pop(date_column, None)
+
+    first_valid = column.first_valid_index()
+    format = guess_format(column.loc[first_valid]) if first_valid is not None else None
+
+    if format is None:
+        return pd.to_datetime(column, utc=True)
+
+    datetimes = pd.to_datetime(column, format=format, utc=True)
+    formats[date_column] = format
+
+    return datetimes
+
+def apply_schema(df, schema):
+    """ Casts the columns of a DataFrame to the types of a schema. Columns that are not on the
+        schema keep their types.
+
+    ### Parameters:
+
+    `df` (pandas.DataFrame): DataFrame of a trace, locations, contacts or metric.
+    `schema` (dict): Schema to be applied, such as `constants.STANDARD_SCHEMA` or `constants.COMPACT_SCHEMA`.
+
+    ### Returns:
+
+    `df` (pandas.DataFrame): DataFrame with the columns casted.
+    """
+    types = {}
+
+    for column in df.columns:
+        base_column = constants.SCHEMA_ALIASES.get(column, column)
+
+        if base_column in schema:
+            types[column] = schema[base_column]
+
+    if schema['id'] == 'int32':
+        for column in ('id', 'id1', 'id2'):
+            if column in types and len(df) and (df[column].min() < np.iinfo(np.int32).min or df[column].max() > np.iinfo(np.int32).max):
+                raise ValueError('The node identifiers of the trace do not fit on the int32 type of the compact schema.')
+
+    return df.astype(types) if types else df
+
+def is_compact(df):
+    """ Checks if a DataFrame follows the compact schema.
+    """
+    for column in ('id', 'id1'):
+        if column in df.columns:
+            return df[column].dtype == np.int32
+
+    for column in ('x', 'x1'):
+        if column in df.columns:
+            return df[column].dtype == np.float32
+
+    return False
+
+def keep_schema(df, like):
+    """ Casts a DataFrame derived from `like` to the compact schema if `like` follows it, so the
+        schema is kept through the locations, contacts and metrics extraction.
+
+    ### Parameters:
+
+    `df` (pandas.DataFrame): Derived DataFrame.
+    `like` (pandas.DataFrame): DataFrame used to derive `df`.
+
+    ### Returns:
+
+    `df` (pandas.DataFrame): The derived DataFrame, casted if needed.
+    """
+    if is_compact(like):
+        return apply_schema(df, constants.COMPACT_SCHEMA)
+
+    return df
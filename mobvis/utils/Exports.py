@@ -1,5 +1,8 @@
 from distutils.log import warn
 
+from mobvis.utils import TraceStore
+from mobvis.utils.BinaryTrace import BinaryTrace
+
 def export_dataframe(df, path):
     """ Exports a DataFrame object to a specified format on a given path.
 
@@ -7,7 +10,10 @@ def export_dataframe(df, path):
 
     `df` (pandas.DataFrame): DataFrame of the object to be exported.
     `path` (str): Path (with filename and extention) where the file should be saved.
-        - Supported extentions: .csv, .xlsx and .txt.
+        - Supported extentions: .csv, .xlsx, .txt, .parquet, .feather and .npy. Parsed traces (with id and timestamp
+          columns) are written to Parquet and Feather files by the mobvis.utils.TraceStore module and can be reloaded
+          with `TraceStore.read_trace`. Other DataFrames are written unchanged. Npy files are memory-mapped traces
+          written by `mobvis.utils.BinaryTrace.BinaryTrace.write`.
     """
     format = path.split('.')[-1] # Get only the file format
 
@@ -17,6 +23,12 @@ def export_dataframe(df, path):
         df.to_excel(path, columns=df.columns, index=False)
     elif format == 'txt':
         df.to_csv(path, columns=df.columns, sep=' ', index=False)
+    elif format in TraceStore.SUPPORTED_FORMATS and {'id', 'timestamp'}.issubset(df.columns):
+        TraceStore.write_trace(df, path)
+    elif format in TraceStore.SUPPORTED_FORMATS:
+        TraceStore.write_frame(df, path)
+    elif format == 'npy':
+        BinaryTrace.write(df, path)
     else:
         warn('WARNING: The provided path does not contain a file with supported file extention, therefore, nothing was saved.')
 
@@ -0,0 +1,139 @@
+import numpy as np
+
+class TraceIndex:
+    """Index that maps each node identifier of a trace to the contiguous slice of rows that holds
+       its records, so the rows of a node are reached in O(1) instead of scanning the whole trace
+       with `trace.id == i`.
+    """
+    def __init__(self, ids):
+        """ Builds the index from the identifiers column of a trace whose rows are grouped by node.
+
+        ### Parameters:
+
+        `ids` (numpy.ndarray): Node identifiers of each row of the trace.
+        """
+        ids = np.asarray(ids)
+
+        starts = self.node_starts(ids)
+
+        self.ids = ids[starts]
+        self.starts = starts
+        self.ends = np.r_[starts[1:], len(ids)].astype(starts.dtype)
+
+        self.positions = dict(zip(self.ids.tolist(), range(len(self.ids))))
+
+        if len(self.positions) != len(self.ids):
+            raise ValueError('The rows of each node must be contiguous to build a TraceIndex. Try sorting the trace by id first.')
+
+    @staticmethod
+    def node_starts(ids):
+        """ Returns the positions where a new run of identifiers starts.
+        """
+        if len(ids) == 0:
+            return np.array([], dtype=np.int64)
+
+        return np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+
+    @classmethod
+    def is_grouped(cls, ids):
+        """ Checks if the rows of each node are contiguous.
+        """
+        ids = np.asarray(ids)
+        starts = cls.node_starts(ids)
+
+        return len(starts) == len(set(ids[starts].tolist()))
+
+    @classmethod
+    def from_trace(cls, trace):
+        """ Builds the index of a trace whose rows are grouped by node.
+        """
+        return cls(trace['id'].values)
+
+    @classmethod
+    def group(cls, trace):
+        """ Builds the index of any trace. If the rows of the nodes are not contiguous, the trace is
+            stably sorted by id first, keeping the original order of the rows of each node.
+
+        ### Parameters:
+
+        `trace` (pandas.DataFrame): DataFrame with an `id` column.
+
+        ### Returns:
+
+        `trace` (pandas.DataFrame): The trace with the rows of each node contiguous.
+        `index` (TraceIndex): Index of the returned trace.
+        """
+        if not cls.is_grouped(trace['id'].values):
+            trace = trace.sort_values(by='id', kind='stable')
+
+        return [trace, cls.from_trace(trace)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, node_id):
+        return node_id in self.positions
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def slice(self, node_id):
+        """ Returns the slice of rows of a node.
+
+        ### Parameters:
+
+        `node_id` (int): Node identifier.
+
+        ### Returns:
+
+        `rows` (slice): Positional slice of the node rows, to be used with `DataFrame.iloc` or NumPy arrays.
+        """
+        try:
+            position = self.positions[node_id]
+        except KeyError:
+            raise KeyError(f'Node {node_id} is not on the trace.')
+
+        return slice(int(self.starts[position]), int(self.ends[position]))
+
+    def node(self, trace, node_id):
+        """ Returns the rows of a node of the indexed trace.
+        """
+        return trace.iloc[self.slice(node_id)]
+
+    def items(self):
+        """ Iterates over the (node identifier, slice of rows) pairs, in the order of the trace.
+        """
+        for node_id, start, end in zip(self.ids.tolist(), self.starts.tolist(), self.ends.tolist()):
+            yield node_id, slice(start, end)
+
+    def take(self, node_ids):
+        """ Returns the row positions of the given nodes, in the order of the list. Nodes that
+            are not on the trace are ignored.
+        """
+        rows = [np.arange(self.starts[self.positions[i]], self.ends[self.positions[i]]) for i in node_ids if i in self.positions]
+
+        return np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+
+    def shards(self, count):
+        """ Splits the indexed trace in up to `count` slices of approximately the same number of rows,
+            without splitting the rows of a node between two slices.
+
+        ### Parameters:
+
+        `count` (int): Number of slices.
+
+        ### Returns:
+
+        `shards` (slice[]): Positional slices of rows, in the order of the trace.
+        """
+        if len(self.ids) == 0:
+            return []
+
+        total = int(self.ends[-1])
+        targets = np.linspace(0, total, count + 1)[1:-1]
+
+        cuts = self.starts[np.searchsorted(self.starts, targets, side='right') - 1]
+        bounds = np.unique(np.r_[0, cuts, total]).tolist()
+
+        return [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
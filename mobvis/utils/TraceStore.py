@@ -0,0 +1,225 @@
+""" The purpose of this module is to persist parsed traces on a columnar format (Parquet or Feather),
+    so a trace is parsed once and reloaded in seconds on the next sessions.
+
+    Parquet files are written sorted by the node identifiers and timestamps, with each row group
+    holding only complete nodes. The min/max statistics that Parquet stores for every row group
+    (id, timestamp, x and y) allow the loaders to skip all the groups that cannot contain the
+    requested nodes, time window or bounding box.
+"""
+import numpy as np
+import pandas as pd
+
+# Approximated number of rows of each Parquet row group.
+ROW_GROUP_SIZE = 1000000
+
+SUPPORTED_FORMATS = ['parquet', 'feather']
+
+def import_pyarrow():
+    """ Imports the pyarrow modules used by the store, which is an optional dependency of MobVis.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("The trace store requires the 'pyarrow' package. Install it with: pip install pyarrow")
+
+    return [pa, pq, feather]
+
+def store_format(path):
+    """ Gets the store format from the file extention of the given path.
+    """
+    format = str(path).split('.')[-1]
+
+    if format not in SUPPORTED_FORMATS:
+        raise ValueError(f'Unsupported trace store format: {format}. Supported formats are: ' + ', '.join(SUPPORTED_FORMATS))
+
+    return format
+
+def row_group_bounds(ids, row_group_size=ROW_GROUP_SIZE):
+    """ Splits a trace sorted by id in groups of approximately `row_group_size` rows, without
+        splitting the rows of a node between two groups.
+
+    ### Parameters:
+
+    `ids` (numpy.ndarray): Node identifiers of the sorted trace.
+    `row_group_size` (int): Approximated number of rows of each group.
+
+    ### Returns:
+
+    `bounds` (numpy.ndarray): Start positions of each group, followed by the trace length.
+    """
+    node_starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.array([0])
+
+    cuts = node_starts[np.searchsorted(node_starts, np.arange(0, len(ids), row_group_size), side='right') - 1]
+
+    return np.r_[np.unique(cuts), len(ids)]
+
+def write_trace(trace, path, row_group_size=ROW_GROUP_SIZE):
+    """ Writes a parsed trace to a Parquet or Feather file.
+
+    ### Parameters:
+
+    `trace` (pandas.DataFrame): DataFrame corresponding to the parsed trace.
+    `path` (str): Path (with filename and extention) where the trace should be saved.
+        - Supported extentions: .parquet and .feather.
+    `row_group_size` (int): Approximated number of rows of each Parquet row group.
+    """
+    pa, pq, feather = import_pyarrow()
+    format = store_format(path)
+
+    if 'id' in trace.columns:
+        sort_by = ['id', 'timestamp'] if 'timestamp' in trace.columns else ['id']
+        trace = trace.sort_values(by=sort_by, kind='stable', ignore_index=True)
+    else:
+        trace = trace.reset_index(drop=True)
+
+    table = pa.Table.from_pandas(trace, preserve_index=False)
+
+    if format == 'feather':
+        feather.write_feather(table, path)
+        return
+
+    if 'id' in trace.columns:
+        bounds = row_group_bounds(trace['id'].values, row_group_size)
+    else:
+        bounds = np.r_[np.arange(0, len(trace), row_group_size), len(trace)]
+
+    with pq.ParquetWriter(path, table.schema, write_statistics=True) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start), row_group_size=end - start)
+
+def write_frame(df, path):
+    """ Writes any DataFrame (e.g. the output of a metric) to a Parquet or Feather file, keeping its rows
+        in the given order.
+
+    ### Parameters:
+
+    `df` (pandas.DataFrame): DataFrame to be saved.
+    `path` (str): Path (with filename and extention) where the DataFrame should be saved.
+        - Supported extentions: .parquet and .feather.
+    """
+    pa, pq, feather = import_pyarrow()
+
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+
+    if store_format(path) == 'feather':
+        feather.write_feather(table, path)
+    else:
+        pq.write_table(table, path)
+
+def write_chunks(chunks, path):
+    """ Writes the chunks yielded by `mobvis.preprocessing.parser.Parser.parse_stream` to a Parquet
+        file, one row group per chunk, so a trace larger than the memory can be stored.
+
+    ### Parameters:
+
+    `chunks` (pandas.DataFrame[]): Iterable of parsed chunks.
+    `path` (str): Path (with filename and .parquet extention) where the trace should be saved.
+    """
+    pa, pq, feather = import_pyarrow()
+
+    if store_format(path) != 'parquet':
+        raise ValueError('Chunked writes are only supported by the Parquet format.')
+
+    writer = None
+
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, write_statistics=True)
+
+            writer.write_table(table, row_group_size=max(len(chunk), 1))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def read_trace(path, ids=None, time_window=None, bbox=None, columns=None):
+    """ Loads a trace saved with `write_trace`, reading only the requested nodes, time window and area.
+
+    ### Parameters:
+
+    `path` (str): Path of the stored trace.
+    `ids` (int[]): If specified, only the rows of these nodes are loaded.
+    `time_window` (float[]): Minimum and maximum timestamps (inclusive) of the loaded rows.
+    `bbox` (float[]): Bounding box of the loaded rows, as [min_x, min_y, max_x, max_y].
+    `columns` (str[]): If specified, only these columns are loaded.
+
+    ### Returns:
+
+    `trace` (pandas.DataFrame): DataFrame corresponding to the loaded trace.
+    """
+    pa, pq, feather = import_pyarrow()
+    format = store_format(path)
+
+    filters = []
+
+    if ids is not None:
+        filters.append(('id', 'in', [int(i) for i in ids]))
+    if time_window is not None:
+        filters.append(('timestamp', '>=', time_window[0]))
+        filters.append(('timestamp', '<=', time_window[1]))
+    if bbox is not None:
+        filters.append(('x', '>=', bbox[0]))
+        filters.append(('y', '>=', bbox[1]))
+        filters.append(('x', '<=', bbox[2]))
+        filters.append(('y', '<=', bbox[3]))
+
+    if format == 'parquet':
+        table = pq.read_table(path, columns=columns, filters=filters if filters else None)
+        return table.to_pandas()
+
+    trace = feather.read_feather(path, memory_map=True)
+
+    mask = np.ones(len(trace), dtype=bool)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= trace[column].isin(value).values
+        elif op == '>=':
+            mask &= (trace[column] >= value).values
+        else:
+            mask &= (trace[column] <= value).values
+
+    trace = trace.loc[mask].reset_index(drop=True)
+
+    return trace[columns] if columns is not None else trace
+
+def trace_statistics(path):
+    """ Reads the min/max statistics of each row group of a trace saved on the Parquet format,
+        without loading its rows.
+
+    ### Parameters:
+
+    `path` (str): Path of the stored trace.
+
+    ### Returns:
+
+    `stats` (pandas.DataFrame): One row per row group, with its number of rows and the minimum and
+        maximum values of the id, timestamp, x and y columns.
+    """
+    pa, pq, feather = import_pyarrow()
+
+    if store_format(path) != 'parquet':
+        raise ValueError('Row group statistics are only available for the Parquet format.')
+
+    metadata = pq.ParquetFile(path).metadata
+    names = metadata.schema.names
+
+    stats = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        row = {'row_group': i, 'num_rows': row_group.num_rows}
+
+        for column in ['id', 'timestamp', 'x', 'y']:
+            if column not in names:
+                continue
+
+            column_stats = row_group.column(names.index(column)).statistics
+            row[f'min_{column}'] = column_stats.min if column_stats is not None else None
+            row[f'max_{column}'] = column_stats.max if column_stats is not None else None
+
+        stats.append(row)
+
+    return pd.DataFrame(stats)
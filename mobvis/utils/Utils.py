@@ -1,8 +1,9 @@
 from distutils.log import warn
-import pandas as pd
 import numpy as np
 from scipy import stats
 
+from mobvis.utils.TraceIndex import TraceIndex
+
 from math import radians, cos, sin, asin, sqrt
 
 
@@ -49,14 +50,12 @@ def fix_size_conditions(df, limit, users_to_display, specific_users):
 def filter_df(full_df, min_index=None, max_index=None, ids_list=None):
     """ Removes all the nodes that should not appear on the fixed DataFrame.
     """
-    fixed_df = pd.DataFrame()
+    full_df, index = TraceIndex.group(full_df)
 
     if not ids_list:
-        for i in range(int(min_index), int(max_index)):
-            fixed_df = pd.concat([fixed_df, full_df.loc[full_df.id == i]], ignore_index=True)
-    else:
-        for i in ids_list:
-            fixed_df = pd.concat([fixed_df, full_df.loc[full_df.id == i]], ignore_index=True)
+        ids_list = range(int(min_index), int(max_index))
+
+    fixed_df = full_df.iloc[index.take(ids_list)].reset_index(drop=True)
 
     return fixed_df
 
@@ -114,6 +113,9 @@ def config_metric_plot(metric_name, differ_nodes):
     elif metric_name == 'INCO':
         x_values = 'intercontact_time'
         title_complement = 'Intercontact Time'
+    elif metric_name == 'CODU':
+        x_values = 'contact_duration'
+        title_complement = 'Contact Duration'
 
     if differ_nodes:
         cmap = 'id'
@@ -211,3 +213,64 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * asin(sqrt(a))
     r = 6371  # Radius of earth in kilometers. Use 3956 for miles
     return c * r * 1000 # meters
+
+def haversine_array(x1, y1, x2, y2):
+    """Vectorized version of `haversine`, evaluated on whole coordinate arrays. The x coordinates
+    are the longitudes and the y coordinates the latitudes, so `haversine_array(x1, y1, x2, y2)`
+    gives the same values as `haversine(x1, y1, x2, y2)`.
+
+    ### Parameters:
+
+    `x1` (numpy.ndarray): Longitudes of the first points.
+    `y1` (numpy.ndarray): Latitudes of the first points.
+    `x2` (numpy.ndarray): Longitudes of the second points.
+    `y2` (numpy.ndarray): Latitudes of the second points.
+
+    ### Returns:
+
+    `distance` (numpy.ndarray): Haversine distances of the points, in meters.
+    """
+
+    lon1, lat1, lon2, lat2 = map(np.radians, [x1, y1, x2, y2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(a))
+    r = 6371  # Radius of earth in kilometers
+    return c * r * 1000 # meters
+
+def to_unit_vectors(x, y):
+    """Projects longitude/latitude coordinates to 3D unit vectors on the sphere. The straight-line
+    (chord) distance between two projected points grows with their Haversine distance, so the
+    Haversine neighbors of a point can be found with an Euclidean spatial index.
+
+    ### Parameters:
+
+    `x` (numpy.ndarray): Longitudes of the points.
+    `y` (numpy.ndarray): Latitudes of the points.
+
+    ### Returns:
+
+    `vectors` (numpy.ndarray): Array with shape (n, 3) containing the unit vectors.
+    """
+
+    lon = np.radians(np.asarray(x, dtype=np.float64))
+    lat = np.radians(np.asarray(y, dtype=np.float64))
+
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def chord_length(distance):
+    """Converts a Haversine distance (in meters) to the chord distance between the unit vectors
+    given by `to_unit_vectors`.
+    """
+
+    r = 6371 * 1000 # Radius of earth in meters
+    return 2 * np.sin(np.minimum(np.asarray(distance, dtype=np.float64), np.pi * r) / (2 * r))
+
+def arc_length(chord):
+    """Converts a chord distance between unit vectors back to the Haversine distance, in meters.
+    """
+
+    r = 6371 * 1000 # Radius of earth in meters
+    return 2 * r * np.arcsin(np.minimum(np.asarray(chord, dtype=np.float64) / 2, 1.0))
@@ -31,3 +31,46 @@ SUPPORTED_IDENTIFIERS = [
     'uid',
     'node_id'
 ]
+
+# Column types of the standard MobVis format. The compact schema is opt-in, and stores the
+# identifiers as int32, the coordinates as float32 (enough for projected data) and the
+# Stay-location identifiers as uint32, roughly halving the memory used by large traces.
+STANDARD_SCHEMA = {
+    'id': 'int64',
+    'timestamp': 'float64',
+    'x': 'float64',
+    'y': 'float64',
+    'sl': 'int64',
+    'gl': 'bool'
+}
+
+COMPACT_SCHEMA = {
+    'id': 'int32',
+    'timestamp': 'float64',
+    'x': 'float32',
+    'y': 'float32',
+    'sl': 'uint32',
+    'gl': 'bool'
+}
+
+# Columns of the locations, contacts and metrics DataFrames that follow the type of one of
+# the schema columns above.
+SCHEMA_ALIASES = {
+    'id1': 'id',
+    'id2': 'id',
+    'x1': 'x',
+    'y1': 'y',
+    'x2': 'x',
+    'y2': 'y',
+    'ix': 'x',
+    'iy': 'y',
+    'fx': 'x',
+    'fy': 'y',
+    'min_x': 'x',
+    'max_x': 'x',
+    'min_y': 'y',
+    'max_y': 'y',
+    'home_location': 'sl',
+    'init_sl': 'sl',
+    'final_sl': 'sl'
+}
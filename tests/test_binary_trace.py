@@ -0,0 +1,46 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.utils.BinaryTrace import BinaryTrace
+
+TRACE = pd.DataFrame({
+    'id': [7, 3, 7, 3, 5],
+    'timestamp': [10.0, 20.0, 0.0, 5.0, 1.0],
+    'x': [1.0, 2.0, 3.0, 4.0, 5.0],
+    'y': [6.0, 7.0, 8.0, 9.0, 10.0]
+})
+
+def test_round_trip_and_node_views(tmp_path):
+    binary_trace = BinaryTrace.write(TRACE, tmp_path / 'trace.npy')
+
+    expected = TRACE.sort_values(by=['id', 'timestamp'], ignore_index=True)
+
+    assert len(binary_trace) == 5
+    assert binary_trace.ids.tolist() == [3, 5, 7]
+    pd.testing.assert_frame_equal(binary_trace.to_dataframe(), expected)
+    pd.testing.assert_frame_equal(binary_trace.to_dataframe(ids=[7, 5]), expected.iloc[[3, 4, 2]].reset_index(drop=True))
+
+    # The records of a node are a view of the mapped file
+    records = binary_trace.node(7)
+    assert records['timestamp'].tolist() == [0.0, 10.0]
+    assert np.shares_memory(records, binary_trace.records)
+
+    with pytest.raises(KeyError):
+        binary_trace.node(4)
+
+def test_pickles_only_the_path(tmp_path):
+    binary_trace = BinaryTrace.write(TRACE, tmp_path / 'trace.npy', coord_dtype='float32')
+
+    reopened = pickle.loads(pickle.dumps(binary_trace))
+
+    assert reopened.records.dtype['x'] == np.float32
+    pd.testing.assert_frame_equal(reopened.to_dataframe(), binary_trace.to_dataframe())
+
+def test_invalid_traces(tmp_path):
+    with pytest.raises(ValueError):
+        BinaryTrace.write(TRACE, tmp_path / 'trace.npy', coord_dtype='int16')
+    with pytest.raises(ValueError):
+        BinaryTrace.write(TRACE.assign(id=2 ** 40), tmp_path / 'trace.npy')
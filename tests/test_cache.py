@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from mobvis.metrics.utils.Contacts import Contacts
+from mobvis.metrics.utils.Locations import Locations
+from tests.test_locations import random_walks
+
+pytest.importorskip('pyarrow')
+
+from mobvis.utils.Cache import ResultCache
+
+def test_hits_return_the_computed_results(tmp_path):
+    cache = ResultCache(tmp_path)
+    trace = random_walks(0)
+
+    computed = Locations.find_locations(trace, 50, 3, 'euclidean', cache=cache)
+    cached = Locations.find_locations(trace, 50, 3, 'euclidean', cache=cache)
+
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    for first, second in zip(computed, cached):
+        pd.testing.assert_frame_equal(first, second)
+
+    # Other parameters or another trace are other entries
+    Locations.find_locations(trace, 60, 3, 'euclidean', cache=cache)
+    Contacts.detect_contacts(trace, 50, 'euclidean', cache=cache)
+    Contacts.detect_contacts(random_walks(1), 50, 'euclidean', cache=cache)
+    assert cache.stats()['misses'] == 4 and cache.stats()['entries'] == 4
+
+    assert cache.invalidate('find_locations', trace, max_d=50, pause_threshold=3, dist_type='euclidean')
+    Locations.find_locations(trace, 50, 3, 'euclidean', cache=cache)
+    assert cache.stats()['misses'] == 5
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path)
+    frames = [pd.DataFrame({'value': range(1000)}) + i for i in range(3)]
+
+    for frame in frames:
+        cache.get_or_compute('frame', frame, {}, lambda: frame)
+
+    # The first entry is read again, so the second one is the least recently used
+    cache.get_or_compute('frame', frames[0], {}, lambda: None)
+    cache.max_bytes = sum(entry[1] for entry in cache.entries()[1:])
+    cache.evict()
+
+    assert cache.evictions == 1
+    assert cache.get_or_compute('frame', frames[1], {}, lambda: frames[1] * 0).value.sum() == 0
+    assert cache.stats()['hits'] == 1
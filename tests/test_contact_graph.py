@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from mobvis.metrics.utils.ContactGraph import ContactGraph
+
+CONTACTS = pd.DataFrame({
+    'id1': [1, 2, 1, 1, 3],
+    'id2': [2, 1, 3, 2, 4],
+    'timestamp': [0.0, 10.0, 70.0, 80.0, 130.0]
+})
+
+def test_aggregated_graph():
+    graph = ContactGraph.from_contacts(CONTACTS)
+
+    assert graph.nodes.tolist() == [1, 2, 3, 4]
+    assert graph.degree().tolist() == [2, 1, 2, 1]
+    assert graph.strength().tolist() == [4.0, 3.0, 2.0, 1.0]
+    assert graph.neighbors(1).to_dict() == {2: 3.0, 3: 1.0}
+    assert (graph.matrix() != graph.matrix().T).nnz == 0
+
+def test_windows_sum_to_the_aggregated_graph(monkeypatch):
+    monkeypatch.setattr(ContactGraph, 'CHUNK_ROWS', 1)
+    monkeypatch.setattr(ContactGraph, 'MERGED_CHUNKS', 2)
+
+    graph = ContactGraph.from_contacts(CONTACTS, window=60)
+
+    assert graph.windows.tolist() == [0.0, 60.0, 120.0]
+    assert graph.degree(0).tolist() == [1, 1, 0, 0]
+    assert graph.strength(1).tolist() == [2.0, 1.0, 1.0, 0.0]
+    assert (graph.matrix() != ContactGraph.from_contacts(CONTACTS).matrix()).nnz == 0
+
+def test_zero_duration_episodes_are_edges():
+    episodes = pd.DataFrame({'id1': [1, 1], 'id2': [2, 3], 'start': [0.0, 10.0], 'end': [0.0, 20.0], 'samples': [1, 2]})
+
+    graph = ContactGraph.from_episodes(episodes)
+
+    assert graph.degree().tolist() == [2, 1, 1]
+    assert graph.neighbors(1).to_dict() == {2: 0.0, 3: 10.0}
+
+    windowed = ContactGraph.from_episodes(episodes, window=5)
+
+    assert windowed.degree(0).tolist() == [1, 1, 0]
+    assert windowed.degree().tolist() == [2, 1, 1]
+
+def test_empty_contacts():
+    empty = CONTACTS.iloc[:0]
+
+    graph = ContactGraph.from_contacts(empty, window=60, nodes=[1, 2])
+
+    assert len(graph) == 0
+    assert graph.degree().tolist() == [0, 0]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.metrics.social.IntercontactTime import IntercontactTime
+from mobvis.metrics.utils.Contacts import Contacts
+from mobvis.utils.Utils import haversine_array
+
+RADIUS = 100
+
+def random_trace(seed, n=80):
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        'id': rng.integers(0, 8, n),
+        'timestamp': rng.integers(0, 12, n) * 10.0,
+        'x': rng.random(n) * 300,
+        'y': rng.random(n) * 300
+    })
+
+def brute_force(df, tolerance=None, window='bin', distance=lambda x1, y1, x2, y2: np.hypot(x1 - x2, y1 - y2)):
+    """ Contacts of every pair of records, as (id1, id2, timestamp) tuples with id1 < id2.
+    """
+    ids, timestamps, x, y = df.id.values, df.timestamp.values, df.x.values, df.y.values
+    contacts = []
+
+    for i in range(len(df)):
+        for j in range(i + 1, len(df)):
+            if ids[i] == ids[j] or distance(x[i], y[i], x[j], y[j]) > RADIUS:
+                continue
+
+            pair = (min(ids[i], ids[j]), max(ids[i], ids[j]))
+
+            if tolerance is None and timestamps[i] == timestamps[j]:
+                contacts.append(pair + (timestamps[i],))
+            elif window == 'sliding' and tolerance is not None and abs(timestamps[i] - timestamps[j]) <= tolerance:
+                contacts.append(pair + (min(timestamps[i], timestamps[j]),))
+            elif window == 'bin' and tolerance is not None and timestamps[i] // tolerance == timestamps[j] // tolerance:
+                contacts.append(pair + (timestamps[i] // tolerance * tolerance,))
+
+    # A single contact of each pair of nodes per bin
+    return sorted(set(contacts)) if window == 'bin' and tolerance is not None else sorted(contacts)
+
+def contact_keys(contacts):
+    id1, id2 = contacts.id1.values, contacts.id2.values
+
+    return sorted(zip(np.minimum(id1, id2).tolist(), np.maximum(id1, id2).tolist(), contacts.timestamp.astype(float).tolist()))
+
+@pytest.mark.parametrize('tolerance, window', [(None, 'bin'), (25, 'bin'), (25, 'sliding')])
+@pytest.mark.parametrize('seed', range(5))
+def test_contacts_match_brute_force(seed, tolerance, window):
+    df = random_trace(seed)
+
+    contacts = Contacts.detect_contacts(df, RADIUS, 'euclidean', tolerance, window)
+
+    assert contact_keys(contacts) == brute_force(df, tolerance, window)
+
+@pytest.mark.parametrize('longitude', [-43.2, 179.999])
+def test_haversine_contacts_match_brute_force(longitude):
+    # Records a few hundred metres apart, also across the antimeridian
+    df = random_trace(0)
+    df['x'] = (longitude + df.x / 300 * 0.004 + 180) % 360 - 180
+    df['y'] = -22.9 + df.y / 300 * 0.004
+
+    contacts = Contacts.detect_contacts(df, RADIUS, 'haversine')
+
+    assert len(contacts) > 0
+    assert contact_keys(contacts) == brute_force(df, distance=haversine_array)
+
+@pytest.mark.parametrize('tolerance, window', [(None, 'bin'), (25, 'bin'), (25, 'sliding')])
+def test_spilled_contacts_match_memory(tmp_path, tolerance, window):
+    df = random_trace(7, n=300)
+
+    contacts = Contacts.detect_contacts(df, RADIUS, 'euclidean', tolerance, window)
+    store = Contacts.detect_contacts(df, RADIUS, 'euclidean', tolerance, window, spill_dir=str(tmp_path), processes=2, chunk_rows=40)
+
+    assert len(store.paths) > 1
+    assert contact_keys(store.to_dataframe()) == contact_keys(contacts) == brute_force(df, tolerance, window)
+
+    # The parts are in time order
+    parts = [part.timestamp.values for part in store.chunks(columns=['timestamp']) if len(part)]
+    assert all(previous.max() <= following.min() for previous, following in zip(parts[:-1], parts[1:]))
+
+    # The Inter-contact Time streams over the parts
+    pd.testing.assert_frame_equal(IntercontactTime(store, gap=10).extract(), IntercontactTime(contacts, gap=10).extract())
+
+@pytest.mark.parametrize('tolerance, window', [(None, 'bin'), (25, 'bin'), (25, 'sliding')])
+@pytest.mark.parametrize('dist_type', ['euclidean', 'haversine'])
+def test_radii_match_single_radius_runs(dist_type, tolerance, window):
+    df = random_trace(3)
+
+    if dist_type == 'haversine':
+        df['x'], df['y'] = -43.2 + df.x / 300 * 0.004, -22.9 + df.y / 300 * 0.004
+
+    radii = [40, 100, 150]
+    contacts = Contacts.detect_contacts_radii(df, radii, dist_type, tolerance, window)
+
+    assert len(contacts[40]) < len(contacts[100]) < len(contacts[150])
+    for radius in radii:
+        assert contact_keys(contacts[radius]) == contact_keys(Contacts.detect_contacts(df, radius, dist_type, tolerance, window))
+        assert (contacts[radius].distance <= radius + 1e-6).all()
+
+    episodes = Contacts.detect_contacts_radii(df, radii, dist_type, tolerance, window, gap=10)
+    pd.testing.assert_frame_equal(episodes[100], Contacts.find_episodes(Contacts.detect_contacts(df, 100, dist_type, tolerance, window), 10), check_dtype=False)
+
+def test_invalid_window():
+    df = random_trace(0)
+
+    with pytest.raises(ValueError):
+        Contacts.detect_contacts(df, RADIUS, 'euclidean', tolerance=0)
+    with pytest.raises(ValueError):
+        Contacts.detect_contacts(df, RADIUS, 'euclidean', tolerance=10, window='fixed')
+    with pytest.raises(ValueError):
+        Contacts.detect_contacts_radii(df, [], 'euclidean')
+    with pytest.raises(ValueError):
+        Contacts.detect_contacts_radii(df, [RADIUS], 'euclidean', tolerance=10, window='fixed')
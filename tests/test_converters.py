@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.metrics.utils.Contacts import Contacts
+from mobvis.metrics.utils.Locations import Locations
+from mobvis.preprocessing.parser import Parser
+from mobvis.utils import Converters
+from mobvis.utils import constants
+from tests.test_locations import random_walks
+
+def raw_trace(dates):
+    return pd.DataFrame({'id': 1, 'date': dates, 'x': 0.0, 'y': 0.0})
+
+def test_epoch_units():
+    trace = Converters.convert_datetime(pd.DataFrame({'date': [1000, 2500]}), 'date', unit='ms')
+
+    assert trace.date.tolist() == [1.0, 2.5]
+
+def test_explicit_format_and_timezones():
+    trace = Converters.convert_datetime(pd.DataFrame({'date': ['02/01/1970 00:00:10']}), 'date', format='%d/%m/%Y %H:%M:%S')
+    assert trace.date.tolist() == [86410.0]
+
+    aware = pd.DataFrame({'date': pd.to_datetime(['1970-01-01 01:00:00']).tz_localize('Europe/Paris')})
+    assert Converters.convert_datetime(aware, 'date', 'date').date.tolist() == [0.0]
+
+def test_compact_schema_is_kept_by_the_extracted_data():
+    trace = Parser.parse(random_walks(0), compact=True)
+
+    assert trace.dtypes.tolist() == [np.int32, np.float64, np.float32, np.float32]
+
+    contacts = Contacts.detect_contacts(trace, 50, 'euclidean')
+    trace_loc, sl_centers = Locations.find_locations(trace, 50, 3, 'euclidean')
+
+    for df in (contacts, trace_loc, sl_centers):
+        assert Converters.is_compact(df)
+        assert df.filter(like='timestamp').dtypes.eq(np.float64).all()
+
+    assert not Converters.is_compact(Parser.parse(random_walks(0)))
+
+def test_compact_schema_rejects_large_ids():
+    with pytest.raises(ValueError):
+        Converters.apply_schema(pd.DataFrame({'id': [2 ** 40], 'x': [0.0]}), constants.COMPACT_SCHEMA)
+
+def test_inferred_format_does_not_leak_between_traces():
+    # The day first format of the first trace must not be used on the second one, where it is ambiguous
+    first = Parser.parse(raw_trace(['13/01/2020 10:00:00']), origin=0)
+    second = Parser.parse(raw_trace(['01/02/2020 10:00:00']), origin=0)
+
+    assert first.timestamp.tolist() == [pd.Timestamp('2020-01-13 10:00:00').timestamp()]
+    assert second.timestamp.tolist() == [pd.Timestamp('2020-01-02 10:00:00').timestamp()]
+
+def test_inferred_format_is_kept_between_chunks():
+    chunks = [raw_trace(['13/01/2020 10:00:00']), raw_trace(['01/02/2020 10:00:00'])]
+
+    parsed = pd.concat(Parser.parse_stream(chunks, origin=0, is_ordered=False))
+
+    assert parsed.timestamp.tolist() == [pd.Timestamp(day).timestamp() for day in ('2020-01-13 10:00:00', '2020-02-01 10:00:00')]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.metrics.social.ContactDuration import ContactDuration
+from mobvis.metrics.social.IntercontactTime import IntercontactTime
+from mobvis.metrics.utils.Contacts import Contacts
+
+def random_contacts(seed, n=150):
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        'id1': rng.integers(0, 5, n),
+        'id2': rng.integers(5, 9, n),
+        'x1': 0.0, 'y1': 0.0, 'x2': 0.0, 'y2': 0.0,
+        'timestamp': rng.integers(0, 50, n) * 10.0
+    })
+
+def baseline_intercontact(contacts, gap):
+    """ Row by row Inter-contact Time of the first MobVis versions: the time between consecutive contacts of
+        each pair, when they are more than `gap` seconds apart.
+    """
+    contacts = contacts.sort_values(['id1', 'id2', 'timestamp'])
+    rows = list(zip(contacts.id1, contacts.id2, contacts.timestamp))
+    inco = []
+
+    for previous, row in zip(rows[:-1], rows[1:]):
+        if row[:2] == previous[:2] and row[2] - previous[2] > gap:
+            inco.append((row[0], row[1], row[2] - previous[2]))
+
+    return inco
+
+@pytest.mark.parametrize('gap', [0, 10, 30])
+@pytest.mark.parametrize('seed', range(5))
+def test_episodes_match_brute_force(seed, gap):
+    contacts = random_contacts(seed)
+
+    expected = []
+    for (id1, id2), pair in contacts.groupby(['id1', 'id2']):
+        timestamps = np.sort(pair.timestamp.values)
+        start = 0
+
+        for i in range(1, len(timestamps) + 1):
+            if i == len(timestamps) or timestamps[i] - timestamps[i - 1] > gap:
+                expected.append((id1, id2, timestamps[start], timestamps[i - 1], i - start))
+                start = i
+
+    episodes = Contacts.find_episodes(contacts, gap)
+
+    assert list(episodes.itertuples(index=False, name=None)) == expected
+
+def test_contact_duration_of_the_episodes():
+    contacts = random_contacts(0)
+
+    episodes = Contacts.find_episodes(contacts, 30)
+    codu = ContactDuration(contacts, gap=30).extract()
+
+    assert codu.timestamp.tolist() == episodes.start.tolist()
+    assert codu.contact_duration.tolist() == (episodes.end - episodes.start).tolist()
+    assert (codu.contact_duration > 0).any()
+
+@pytest.mark.parametrize('gap', [0, 30])
+@pytest.mark.parametrize('seed', range(5))
+def test_intercontact_time_matches_baseline(seed, gap):
+    contacts = random_contacts(seed)
+
+    metric = IntercontactTime(contacts.copy(), gap=gap)
+    inco = metric.extract()
+
+    assert list(inco.itertuples(index=False, name=None)) == baseline_intercontact(contacts, gap)
+
+    expected = inco.groupby(['id1', 'id2']).intercontact_time.agg(['count', 'mean', 'median']).reset_index()
+    pd.testing.assert_frame_equal(metric.pair_stats.sort_values(['id1', 'id2'], ignore_index=True), expected)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.metrics.utils.HomeLocations import HomeLocations
+
+HOUR = 3600.0
+
+# Node 1 stays 3 hours on sl 0 in the afternoon and 2 hours on sl 1 around midnight. Node 2 is never seen at night
+TRACE_LOC = pd.DataFrame({
+    'id': [1, 1, 1, 1, 2, 2, 2, 2],
+    'sl': [0, 0, 1, 1, 5, 5, 6, 6],
+    'timestamp': [0, 3 * HOUR, 10 * HOUR, 12 * HOUR, 0, HOUR, 2 * HOUR, 2.5 * HOUR],
+    'x': [1.0, 1.0, 2.0, 2.0, 5.0, 5.0, 6.0, 6.0],
+    'y': 0.0
+})
+
+def test_dwell_and_night_rules():
+    dwell = HomeLocations.find_homes(TRACE_LOC)
+    night = HomeLocations.find_homes(TRACE_LOC, rule='night', origin='1970-01-01 12:00:00')
+
+    assert dwell.home_location.tolist() == [0, 5]
+    assert night.home_location.tolist() == [1, 5]
+    assert night.x.tolist() == [2.0, 5.0]
+
+    with pytest.raises(ValueError):
+        HomeLocations.find_homes(TRACE_LOC, rule='weekend')
+
+def test_night_seconds_wrap_around_midnight():
+    seconds = HomeLocations.night_seconds(np.array([0.0, 23 * HOUR, 24 * HOUR, 30 * HOUR]), (22, 6))
+
+    assert (seconds / HOUR).tolist() == [0.0, 7.0, 8.0, 14.0]
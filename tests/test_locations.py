@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.metrics.utils.Locations import Locations
+
+def random_walks(seed, nodes=6, steps=60):
+    rng = np.random.default_rng(seed)
+
+    # Slow walks with long pauses, so every node has a few Stay-locations
+    moves = rng.normal(0, 20, (nodes, steps, 2)) * (rng.random((nodes, steps, 1)) < 0.3)
+    positions = moves.cumsum(axis=1)
+
+    return pd.DataFrame({
+        'id': np.repeat(np.arange(nodes), steps),
+        'timestamp': np.tile(np.arange(steps) * 30.0, nodes),
+        'x': positions[:, :, 0].ravel(),
+        'y': positions[:, :, 1].ravel()
+    })
+
+def test_sharded_locations_match_serial():
+    trace = random_walks(0)
+
+    serial_loc, serial_centers = Locations.find_locations(trace, 50, 3, 'euclidean')
+    sharded_loc, sharded_centers = Locations.find_locations(trace, 50, 3, 'euclidean', processes=2)
+
+    assert serial_loc.gl.sum() > 0
+    pd.testing.assert_frame_equal(serial_loc.reset_index(drop=True), sharded_loc.reset_index(drop=True))
+    pd.testing.assert_frame_equal(serial_centers.reset_index(drop=True), sharded_centers.reset_index(drop=True))
+
+def test_sl_centers_match_groupby():
+    trace_loc, sl_centers = Locations.find_locations(random_walks(1), 50, 3, 'euclidean')
+
+    groups = trace_loc.groupby(['id', 'sl'])
+    expected = groups.agg(
+        x=('x', 'mean'), y=('y', 'mean'),
+        max_x=('x', 'max'), min_x=('x', 'min'), max_y=('y', 'max'), min_y=('y', 'min'),
+        first_timestamp=('timestamp', 'first'), last_timestamp=('timestamp', 'last'), n_points=('x', 'size')
+    ).reset_index()
+    expected.insert(10, 'duration', expected.last_timestamp - expected.first_timestamp)
+
+    # Only the Stay-locations longer than the pause threshold are Geo-locations, and every row of them is flagged
+    is_geo = expected.duration > 60 * 3
+    assert is_geo.any() and not is_geo.all()
+    assert (trace_loc.gl == trace_loc.set_index(['id', 'sl']).index.isin(expected[is_geo].set_index(['id', 'sl']).index)).all()
+
+    pd.testing.assert_frame_equal(sl_centers.reset_index(drop=True), expected[is_geo].reset_index(drop=True), check_dtype=False)
+
+def test_sweep_matches_find_locations():
+    trace = random_walks(2)
+
+    sweep, labels = Locations.sweep_locations(trace, [30, 60], [2, 5], 'euclidean', return_labels=True)
+
+    assert len(sweep) == 4
+    for row in sweep.itertuples():
+        trace_loc, sl_centers = Locations.find_locations(trace, row.max_d, row.pause_threshold, 'euclidean')
+
+        assert row.geo_locations == len(sl_centers)
+        assert row.geo_points_ratio == pytest.approx(trace_loc.gl.mean())
+        np.testing.assert_array_equal(labels[(row.max_d, row.pause_threshold)].sl.values, trace_loc.sl.values)
+        np.testing.assert_array_equal(labels[(row.max_d, row.pause_threshold)].gl.values, trace_loc.gl.values)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from mobvis.metrics.utils.Locations import Locations
+from mobvis.metrics.utils.OnlineLocations import OnlineLocations
+from tests.test_locations import random_walks
+
+def test_batches_match_find_locations():
+    trace = random_walks(0)
+    detector = OnlineLocations(50, 3, 'euclidean')
+
+    batches = [trace[(trace.timestamp >= start) & (trace.timestamp < start + 450)] for start in range(0, 1800, 450)]
+    closed = pd.concat([detector.update(batch) for batch in batches] + [detector.flush()], ignore_index=True)
+
+    _, sl_centers = Locations.find_locations(trace, 50, 3, 'euclidean')
+    geo_locations = closed[closed.gl].sort_values(by=['id', 'sl'], ignore_index=True)
+
+    pd.testing.assert_frame_equal(geo_locations[sl_centers.columns], sl_centers.reset_index(drop=True), check_dtype=False)
+
+def test_released_nodes_restart_their_identifiers():
+    detector = OnlineLocations(10, 1, 'euclidean', max_idle=100)
+    batch = pd.DataFrame({'id': [1, 1], 'timestamp': [0.0, 10.0], 'x': [0.0, 100.0], 'y': 0.0})
+
+    assert detector.update(batch).sl.tolist() == [0]
+
+    # The node is idle for too long, so its open Stay-location is closed and nothing of it is kept
+    other = pd.DataFrame({'id': [2], 'timestamp': [500.0], 'x': [0.0], 'y': [0.0]})
+    assert detector.update(other).sl.tolist() == [1]
+    assert 1 not in detector.states and 1 not in detector.next_sl
+
+    # Node 2 is released by the same batch
+    closed = detector.update(batch.assign(timestamp=[600.0, 610.0]))
+    assert list(zip(closed.id, closed.sl)) == [(1, 0), (2, 0)]
+
+    flushed = detector.flush()
+    assert list(zip(flushed.id, flushed.sl)) == [(1, 1)]
+    assert detector.states == {} and detector.next_sl == {}
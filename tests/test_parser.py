@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from mobvis.preprocessing.parser import Parser
+
+def std_trace(timestamps):
+    # Columns out of the standard order on purpose
+    return pd.DataFrame({'x': 0.0, 'y': 0.0, 'timestamp': timestamps, 'id': 1})
+
+def test_fix_timestamps_on_the_smallest_timestamp():
+    fixed = Parser.fix_timestamps(std_trace([130.0, 100.0, 160.0]))
+
+    assert fixed.columns.tolist() == ['id', 'timestamp', 'x', 'y']
+    assert fixed.timestamp.tolist() == [30.0, 0.0, 60.0]
+
+def test_shared_origin_across_traces():
+    first = Parser.fix_timestamps(std_trace([100.0, 110.0]), origin=100)
+    second = Parser.fix_timestamps(std_trace([150.0, 170.0]), origin=100)
+
+    assert first.timestamp.tolist() == [0.0, 10.0]
+    assert second.timestamp.tolist() == [50.0, 70.0]
+
+def test_datetime_origins():
+    trace = std_trace([100.0, 160.0])
+
+    for origin in ('1970-01-01 00:01:40', datetime(1970, 1, 1, 0, 1, 40)):
+        assert Parser.fix_timestamps(trace, origin=origin).timestamp.tolist() == [0.0, 60.0]
+
+def raw_trace(nodes=5, records=7):
+    return pd.DataFrame({
+        'id': [node for node in range(nodes) for _ in range(records)],
+        'timestamp': [100.0 + 10 * record + node for node in range(nodes) for record in range(records)],
+        'x': [float(record) for _ in range(nodes) for record in range(records)],
+        'y': 0.0
+    })
+
+def test_parse_stream_matches_parse(tmp_path):
+    raw = raw_trace()
+    path = tmp_path / 'trace.csv'
+    raw.to_csv(path, index=False)
+
+    chunks = list(Parser.parse_stream(str(path), chunksize=4))
+
+    # The rows of a node are never split between chunks
+    assert len(chunks) > 1
+    assert all(set(previous.id).isdisjoint(following.id) for previous, following in zip(chunks[:-1], chunks[1:]))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), Parser.parse(raw.copy()), check_dtype=False)
+
+def test_parse_stream_needs_an_origin_for_one_shot_iterators():
+    chunks = iter([raw_trace()])
+
+    with pytest.raises(ValueError):
+        next(Parser.parse_stream(chunks))
+
+def test_multiparse_processes_match_threads(tmp_path):
+    raw_traces = [raw_trace(), raw_trace(nodes=3).sample(frac=1, random_state=0)]
+
+    threads = Parser.multiparse([raw.copy() for raw in raw_traces], [True, False])
+    processes = Parser.multiparse([raw.copy() for raw in raw_traces], [True, False], use_processes=True, processes=2)
+
+    for threaded, processed in zip(threads, processes):
+        pd.testing.assert_frame_equal(processed, threaded.reset_index(drop=True), check_dtype=False)
+
+    binary_traces = Parser.multiparse(raw_traces, [True, False], use_processes=True, processes=2, out_dir=str(tmp_path), as_binary=True)
+
+    assert [len(binary_trace) for binary_trace in binary_traces] == [35, 21]
+    assert sorted(path.name for path in tmp_path.glob('trace_*.npy')) == ['trace_0.idx.npy', 'trace_0.npy', 'trace_1.idx.npy', 'trace_1.npy']
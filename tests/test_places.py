@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from mobvis.metrics.utils.Places import Places
+
+SL_CENTERS = pd.DataFrame({
+    'id': [1, 2, 3, 1],
+    'sl': [0, 0, 1, 2],
+    'x': [0.0, 8.0, 16.0, 100.0],
+    'y': 0.0
+})
+
+TRACE_LOC = pd.DataFrame({'id': [1, 1, 1, 2, 3], 'sl': [0, 1, 2, 0, 1], 'x': 0.0, 'y': 0.0})
+
+def test_chained_centers_share_a_place():
+    trace_loc, sl_centers, places = Places.find_places(TRACE_LOC, SL_CENTERS, 10, 'euclidean')
+
+    # The first three centers are chained by pairs closer than the radius
+    assert sl_centers.place_id.tolist() == [0, 0, 0, 1]
+    assert trace_loc.place_id.tolist() == [0, -1, 1, 0, 0]
+
+    assert places.x.tolist() == [8.0, 100.0]
+    assert places.n_nodes.tolist() == [3, 1]
+    assert places.n_visits.tolist() == [3, 1]
+
+def test_haversine_radius_in_metres():
+    # About 550 metres apart
+    centers = pd.DataFrame({'id': [1, 2], 'sl': [0, 0], 'x': [-43.2, -43.2], 'y': [-22.9, -22.905]})
+
+    assert Places.find_places(centers, centers, 1000, 'haversine')[1].place_id.tolist() == [0, 0]
+    assert Places.find_places(centers, centers, 500, 'haversine')[1].place_id.tolist() == [0, 1]
+
+    with pytest.raises(ValueError):
+        Places.find_places(centers, centers, 500, 'manhattan')
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from mobvis.metrics.utils.Spreading import Spreading
+from mobvis.utils.ContactStore import ContactStore
+
+# Out of order on purpose: 1 reaches 2 at 10, 2 reaches 3 at 20 and 3 reaches 4 at 30.
+# The contact of 4 and 5 at 10 happens before 4 is reached, and the contacts of 5 and 6 share a timestamp
+CONTACTS = pd.DataFrame({
+    'id1': [3, 2, 4, 1, 5, 4, 5],
+    'id2': [4, 3, 5, 2, 6, 5, 6],
+    'x1': 0.0, 'y1': 0.0, 'x2': 0.0, 'y2': 0.0,
+    'timestamp': [30.0, 20.0, 40.0, 10.0, 40.0, 10.0, 40.0]
+})
+
+EXPECTED = pd.DataFrame({
+    'id': [1, 2, 3, 4, 5, 6],
+    'arrival_time': [0.0, 10.0, 20.0, 30.0, 40.0, np.nan],
+    'hops': [0, 1, 2, 3, 4, -1]
+})
+
+def test_earliest_arrival_out_of_order(monkeypatch):
+    # Blocks of about two events must not change the result
+    monkeypatch.setattr(Spreading, 'BLOCK_ENTRIES', 2)
+
+    arrivals = Spreading.earliest_arrival(CONTACTS, [1])
+
+    pd.testing.assert_frame_equal(arrivals, EXPECTED, check_dtype=False)
+
+def test_earliest_arrival_streams_store_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(Spreading, 'BLOCK_ENTRIES', 1)
+
+    # Parts in time order, with the events of timestamp 40 split between the last two parts
+    contacts = CONTACTS.sort_values('timestamp', kind='stable')
+    for number, rows in enumerate([slice(0, 3), slice(3, 5), slice(5, 7)]):
+        ContactStore.write_part(contacts.iloc[rows], ContactStore.part_path(tmp_path, number))
+
+    arrivals = Spreading.earliest_arrival(ContactStore(tmp_path), [1])
+
+    pd.testing.assert_frame_equal(arrivals, EXPECTED, check_dtype=False)
+
+def test_si_with_certain_infection_matches_earliest_arrival():
+    infections, recoveries, prevalence = Spreading.simulate(CONTACTS, [1], beta=1.0, runs=3, random_state=0)
+
+    for run in range(3):
+        np.testing.assert_array_equal(infections.loc[run].values, EXPECTED.arrival_time.values)
+
+    assert recoveries.isna().all().all()
+    assert prevalence.infected.iloc[-1] == 5
+
+def test_hops_of_later_paths_with_fewer_contacts():
+    # 4 is reached at 3 with 3 hops, and again at 4 with a single hop, which reaches 5 at 5 with 2 hops
+    contacts = pd.DataFrame({'id1': [1, 2, 3, 1, 4], 'id2': [2, 3, 4, 4, 5], 'timestamp': [1.0, 2.0, 3.0, 4.0, 5.0]})
+
+    arrivals = Spreading.earliest_arrival(contacts, [1])
+
+    assert arrivals.arrival_time.tolist() == [0.0, 1.0, 2.0, 3.0, 5.0]
+    assert arrivals.hops.tolist() == [0, 1, 2, 3, 2]
+
+def test_sir_earlier_infection_stops_a_later_one(monkeypatch):
+    # 3 is infected by 1 at 2 and recovers at 7, so it can not infect 4 at 8. Had 2 infected it at 5, it would
+    contacts = pd.DataFrame({'id1': [3, 1, 1, 2], 'id2': [4, 2, 3, 3], 'timestamp': [8.0, 1.0, 2.0, 5.0]})
+
+    for block_entries in (2, 100):
+        monkeypatch.setattr(Spreading, 'BLOCK_ENTRIES', block_entries)
+
+        infections, recoveries, prevalence = Spreading.simulate(contacts, [1], beta=1.0, model='SIR', recovery_time=5, runs=2, random_state=0)
+
+        for run in range(2):
+            np.testing.assert_array_equal(infections.loc[run].values, [0.0, 1.0, 2.0, np.nan])
+            np.testing.assert_array_equal(recoveries.loc[run].values, [5.0, 6.0, 7.0, np.nan])
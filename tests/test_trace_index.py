@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.utils.TraceIndex import TraceIndex
+
+TRACE = pd.DataFrame({'id': [4, 4, 1, 1, 1, 9], 'timestamp': [0.0, 1.0, 0.0, 1.0, 2.0, 0.0]})
+
+def test_slices_match_id_scans():
+    index = TraceIndex.from_trace(TRACE)
+
+    assert list(index) == [4, 1, 9] and 1 in index and 2 not in index
+    for node_id in (1, 4, 9):
+        pd.testing.assert_frame_equal(index.node(TRACE, node_id), TRACE[TRACE.id == node_id])
+
+    assert index.take([9, 2, 4]).tolist() == [5, 0, 1]
+    assert [rows for _, rows in index.items()] == [slice(0, 2), slice(2, 5), slice(5, 6)]
+
+    with pytest.raises(KeyError):
+        index.slice(2)
+
+def test_group_sorts_split_nodes_stably():
+    trace = pd.DataFrame({'id': [2, 1, 2, 1], 'timestamp': [0.0, 1.0, 2.0, 3.0]})
+
+    with pytest.raises(ValueError):
+        TraceIndex.from_trace(trace)
+
+    grouped, index = TraceIndex.group(trace)
+
+    assert grouped.id.tolist() == [1, 1, 2, 2]
+    assert index.node(grouped, 2).timestamp.tolist() == [0.0, 2.0]
+
+def test_shards_keep_nodes_whole():
+    ids = np.repeat(np.arange(10), np.arange(1, 11))
+    index = TraceIndex(ids)
+
+    shards = index.shards(3)
+
+    assert len(shards) == 3
+    assert shards[0].start == 0 and shards[-1].stop == len(ids)
+    assert all(ids[shard.stop - 1] != ids[shard.stop] for shard in shards[:-1])
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mobvis.utils import TraceStore
+
+pytest.importorskip('pyarrow')
+
+def parsed_trace(nodes=6, records=10):
+    rng = np.random.default_rng(0)
+
+    return pd.DataFrame({
+        'id': np.repeat(np.arange(nodes), records)[::-1].copy(),
+        'timestamp': np.tile(np.arange(records) * 10.0, nodes),
+        'x': rng.random(nodes * records) * 100,
+        'y': rng.random(nodes * records) * 100
+    })
+
+def expected_rows(trace, mask):
+    return trace[mask].sort_values(by=['id', 'timestamp'], ignore_index=True)
+
+@pytest.mark.parametrize('extention', ['parquet', 'feather'])
+def test_pushdown_filters(tmp_path, extention):
+    trace = parsed_trace()
+    path = str(tmp_path / f'trace.{extention}')
+    TraceStore.write_trace(trace, path, row_group_size=15)
+
+    pd.testing.assert_frame_equal(TraceStore.read_trace(path), expected_rows(trace, trace.id >= 0))
+    pd.testing.assert_frame_equal(TraceStore.read_trace(path, ids=[1, 4]), expected_rows(trace, trace.id.isin([1, 4])))
+    pd.testing.assert_frame_equal(TraceStore.read_trace(path, time_window=[20, 40]), expected_rows(trace, trace.timestamp.between(20, 40)))
+
+    in_bbox = trace.x.between(10, 60) & trace.y.between(20, 80)
+    pd.testing.assert_frame_equal(TraceStore.read_trace(path, bbox=[10, 20, 60, 80]), expected_rows(trace, in_bbox))
+
+def test_row_groups_hold_complete_nodes(tmp_path):
+    path = str(tmp_path / 'trace.parquet')
+    TraceStore.write_trace(parsed_trace(), path, row_group_size=15)
+
+    stats = TraceStore.trace_statistics(path)
+
+    assert len(stats) > 1
+    assert (stats.max_id.values[:-1] < stats.min_id.values[1:]).all()
+    assert stats.num_rows.sum() == 60
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        TraceStore.write_trace(parsed_trace(), str(tmp_path / 'trace.csv'))